@@ -0,0 +1,114 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PRICE_PRECISION = 5
+
+
+def _fixed_point_bytes(values):
+    # Nautilus-style fixed-point raw values: little-endian int64 scaled by 1e9
+    raw = np.round(values * 1e9).astype('<i8')
+    return pa.FixedSizeBinaryArray.from_buffers(pa.binary(8), len(raw), [None, pa.py_buffer(raw.tobytes())])
+
+
+def generate_datatype(
+    path: str,
+    rows: int,
+    start: str = "2024-01-01",
+    frequency: str = "1min",
+    float_columns: int = 3,
+    bytes_columns: int = 1,
+    gap_fraction: float = 0.05,
+    files: int = 1,
+    row_group_size: int = 100_000,
+    factor=None,
+    rng=None,
+):
+    rng = rng or np.random.default_rng(0)
+    os.makedirs(path, exist_ok=True)
+
+    timestamps = pd.date_range(start, periods=rows, freq=frequency, unit="ns").asi8
+    keep = rng.random(rows) >= gap_fraction
+    timestamps = timestamps[keep]
+
+    # Prices share a common random-walk factor so that instruments generated
+    # together are genuinely correlated.
+    shared = factor[keep] if factor is not None else 0.0
+    close = 100 + shared + np.cumsum(rng.normal(scale=0.1, size=len(timestamps)))
+
+    columns = {"ts_event": pa.array(timestamps.astype(np.uint64), pa.uint64()), "close": pa.array(close)}
+    for i in range(1, float_columns):
+        columns[f"value_{i}"] = pa.array(close + rng.normal(size=len(timestamps)))
+    for i in range(bytes_columns):
+        columns[f"raw_price_{i}" if i else "raw_price"] = _fixed_point_bytes(close + i)
+
+    table = pa.table(columns).replace_schema_metadata({"price_precision": str(PRICE_PRECISION), "size_precision": "0"})
+    bounds = np.linspace(0, len(table), files + 1).astype(int)
+    for part, (lower, upper) in enumerate(zip(bounds[:-1], bounds[1:])):
+        pq.write_table(table.slice(lower, upper - lower), os.path.join(path, f"part-{part:03d}.parquet"), row_group_size=row_group_size)
+
+    return len(table)
+
+
+def generate_tree(
+    root: str,
+    instruments: int = 3,
+    datatype: str = "bars_1min",
+    rows: int = 100_000,
+    seed: int = 0,
+    **datatype_options,
+):
+    rng = np.random.default_rng(seed)
+    factor = np.cumsum(rng.normal(scale=0.1, size=rows))
+    written = {}
+    for i in range(instruments):
+        instrument = f"INST{i:03d}"
+        written[instrument] = generate_datatype(
+            os.path.join(root, instrument, datatype),
+            rows,
+            factor=factor,
+            rng=rng,
+            **datatype_options
+        )
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic data/<instrument>/<datatype>/*.parquet tree")
+    parser.add_argument("root", help="Output data folder")
+    parser.add_argument("--instruments", type=int, default=3)
+    parser.add_argument("--datatype", default="bars_1min")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--frequency", default="1min")
+    parser.add_argument("--float-columns", type=int, default=3)
+    parser.add_argument("--bytes-columns", type=int, default=1)
+    parser.add_argument("--gap-fraction", type=float, default=0.05)
+    parser.add_argument("--files", type=int, default=1)
+    parser.add_argument("--row-group-size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    written = generate_tree(
+        args.root,
+        instruments=args.instruments,
+        datatype=args.datatype,
+        rows=args.rows,
+        seed=args.seed,
+        start=args.start,
+        frequency=args.frequency,
+        float_columns=args.float_columns,
+        bytes_columns=args.bytes_columns,
+        gap_fraction=args.gap_fraction,
+        files=args.files,
+        row_group_size=args.row_group_size,
+    )
+    print(json.dumps(written))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+from correlation_backend.benchmarks.generate_data import generate_tree
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_OFFSETS = (0, 1, -5)
+DEFAULT_METHODS = ("pearson", "spearman", "kendalltau", "linregress")
+
+
+def time_stage(fn, repeat: int, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {"min_seconds": min(timings), "median_seconds": statistics.median(timings), "repeat": repeat}
+
+
+def _environment():
+    import pandas as pd
+    import pyarrow as pa
+    import scipy
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "scipy": scipy.__version__,
+    }
+
+
+def run_benchmarks(data_folder: str, sizes=DEFAULT_SIZES, offsets=DEFAULT_OFFSETS, methods=DEFAULT_METHODS, repeat: int = 3, **generator_options):
+    # The pipeline reads its data folder at import time, so it is only
+    # imported once CORRELATION_DATA_FOLDER points at the generated tree.
+    os.environ["CORRELATION_DATA_FOLDER"] = data_folder
+    if "correlation_backend.logic.read_data" in sys.modules:
+        raise RuntimeError("run_benchmarks must run before correlation_backend.logic.read_data is imported")
+
+    import pyarrow.parquet as pq
+    from correlation_backend.logic import read_data
+    from correlation_backend.logic.calc_analysis import correlation_analysis
+    from correlation_backend.logic.catalog import Catalog
+    from correlation_backend.logic.responses import render_response
+    from correlation_backend.logic.series_cache import series_cache
+    from correlation_backend.main import FindFilePath, _compute_analysis
+
+    for size in sizes:
+        generate_tree(data_folder, instruments=2, datatype=f"rows_{size}", rows=size, **generator_options)
+
+    results = []
+
+    def record(size, stage, timing, offset=None, items=None):
+        results.append({"rows": size, "offset": offset, "stage": stage, "items": items, **timing})
+
+    for size in sizes:
+        datatype = f"rows_{size}"
+        scan_index = os.path.join(data_folder, ".benchmark-catalog.json")
+        record(size, "catalog_scan", time_stage(lambda: Catalog(data_folder, index_path=scan_index).rescan(full=True), repeat))
+
+        def lookup():
+            for instrument in read_data.catalog.match_instruments("INST"):
+                for data_type in read_data.catalog.match_datatypes(instrument, datatype):
+                    read_data.catalog.columns(instrument, data_type)
+                    read_data.catalog.files(instrument, data_type)
+        record(size, "catalog_lookup", time_stage(lookup, repeat))
+
+        entry = read_data.catalog.files("INST000", datatype)[0]
+        file_path = read_data.catalog.file_path(entry)
+        table = pq.read_table(file_path)
+        record(size, "parquet_read", time_stage(lambda: pq.read_table(file_path, columns=["ts_event", "close"]), repeat), items=table.num_rows)
+        record(size, "decode_numeric", time_stage(lambda: table.select(["ts_event", "close"]).to_pandas().set_index("ts_event"), repeat), items=table.num_rows)
+        precision = read_data.fixed_point_precision(table.schema, "raw_price")
+        record(size, "decode_bytes", time_stage(lambda: read_data.decode_binary_array(table.column("raw_price"), precision), repeat), items=table.num_rows)
+
+        # The middle half of the file, read with the timestamp filter pushed down
+        quarter = (entry['max_timestamp'] - entry['min_timestamp']) // 4
+        window = (entry['min_timestamp'] + quarter, entry['max_timestamp'] - quarter)
+        record(size, "load_full", time_stage(lambda: read_data._read_column_series(file_path, "close"), repeat), items=table.num_rows)
+        record(size, "load_window", time_stage(lambda: read_data._read_column_series(file_path, "close", *window), repeat))
+        record(size, "load_cached", time_stage(lambda: read_data.load_datatype_series("INST000", datatype, "close"), repeat))
+
+        # A one-month window sliced from the whole-file column, as a cached
+        # file serves each request's window
+        full_column = read_data._read_column_series(file_path, "close")
+        month = (entry['min_timestamp'], entry['min_timestamp'] + 30 * 24 * 3600 * 10 ** 9)
+        record(size, "slice", time_stage(lambda: read_data._slice_window(full_column, *month), repeat), items=len(full_column))
+
+        target = read_data.load_datatype_series("INST000", datatype, "close")
+        comparison = read_data.load_datatype_series("INST001", datatype, "raw_price")
+        for offset in offsets:
+            record(size, "align", time_stage(lambda: read_data.align_series_with_offset(target, comparison, offset), repeat), offset, len(target))
+
+            aligned_target, aligned_comparison = read_data.align_series_with_offset(target, comparison, offset)
+            x, y = aligned_target.to_numpy(), aligned_comparison.to_numpy()
+            for method in methods:
+                record(size, f"stat_{method}", time_stage(lambda: correlation_analysis(x, y, [method]), repeat), offset, len(x))
+            if "kendalltau" in methods:
+                record(size, "stat_kendalltau_subsample", time_stage(lambda: correlation_analysis(x, y, ["kendalltau"], "subsample"), repeat), offset, len(x))
+
+        payload = {"target_column_content": target, "comparison_column_contents": [comparison], "pearson_results": [(0.5, 0.01)]}
+        record(size, "serialize_points", time_stage(lambda: render_response(payload, "points"), repeat), items=len(target) + len(comparison))
+        record(size, "serialize_columnar", time_stage(lambda: render_response(payload, "columnar"), repeat), items=len(target) + len(comparison))
+        record(size, "serialize_arrow", time_stage(lambda: render_response(payload, accept="application/vnd.apache.arrow.stream"), repeat), items=len(target) + len(comparison))
+
+        first = datetime.fromtimestamp(entry['min_timestamp'] / 1e9, tz=timezone.utc)
+        last = datetime.fromtimestamp(entry['max_timestamp'] / 1e9, tz=timezone.utc)
+        request = FindFilePath(
+            target_instrument="INST000",
+            target_datatype=datatype,
+            target_data_column="close",
+            comparison_instruments=["INST001"],
+            comparison_datatypes=[datatype],
+            comparison_data_columns=["close", "raw_price"],
+            methods=list(methods),
+            start_month=str(first.month),
+            start_year=str(first.year),
+            end_month=str(last.month),
+            end_year=str(last.year),
+        )
+        record(size, "end_to_end_cold", time_stage(lambda: render_response(_compute_analysis(request)), repeat, setup=series_cache.invalidate))
+        record(size, "end_to_end_warm", time_stage(lambda: render_response(_compute_analysis(request)), repeat))
+
+    return {"environment": _environment(), "sizes": list(sizes), "offsets": list(offsets), "methods": list(methods), "results": results}
+
+
+def compare(baseline: dict, current: dict):
+    # Ratio of median timings per (rows, offset, stage); above 1 is slower.
+    baseline_timings = {(r["rows"], r["offset"], r["stage"]): r["median_seconds"] for r in baseline["results"]}
+    comparison = []
+    for r in current["results"]:
+        before = baseline_timings.get((r["rows"], r["offset"], r["stage"]))
+        if before:
+            comparison.append({
+                "rows": r["rows"],
+                "offset": r["offset"],
+                "stage": r["stage"],
+                "baseline_seconds": before,
+                "current_seconds": r["median_seconds"],
+                "ratio": r["median_seconds"] / before,
+            })
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the correlation pipeline on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--offsets", type=int, nargs="+", default=list(DEFAULT_OFFSETS))
+    parser.add_argument("--methods", nargs="+", default=list(DEFAULT_METHODS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--frequency", default="1min")
+    parser.add_argument("--float-columns", type=int, default=3)
+    parser.add_argument("--bytes-columns", type=int, default=1)
+    parser.add_argument("--gap-fraction", type=float, default=0.05)
+    parser.add_argument("--files", type=int, default=1)
+    parser.add_argument("--row-group-size", type=int, default=100_000)
+    parser.add_argument("--data-folder", help="Where to generate data (default: a temporary folder removed afterwards)")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    args = parser.parse_args()
+
+    data_folder = args.data_folder or tempfile.mkdtemp(prefix="correlation-benchmark-")
+    try:
+        report = run_benchmarks(
+            data_folder,
+            sizes=args.sizes,
+            offsets=args.offsets,
+            methods=args.methods,
+            repeat=args.repeat,
+            frequency=args.frequency,
+            float_columns=max(args.float_columns, 1),
+            bytes_columns=max(args.bytes_columns, 1),
+            gap_fraction=args.gap_fraction,
+            files=args.files,
+            row_group_size=args.row_group_size,
+        )
+    finally:
+        if not args.data_folder:
+            shutil.rmtree(data_folder, ignore_errors=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(json.load(f), report)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
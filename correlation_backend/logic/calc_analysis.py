@@ -1,4 +1,9 @@
-from scipy.stats import pearsonr, spearmanr, kendalltau, linregress
+import os
+import numpy as np
+from scipy.stats import pearsonr, spearmanr, kendalltau, linregress, rankdata
+from scipy.stats import norm
+from scipy.stats import t as t_dist
+from correlation_backend.logic.instrumentation import stage
 from correlation_backend.logic.json_utils import convert_analysis_result
 
 def pearson_analysis(target_series, comparison_series):
@@ -28,3 +33,122 @@ def linregress_analysis(target_series, comparison_series):
         return None, None, None, None, None
     regress = linregress(data.iloc[:, 0], data.iloc[:, 1])
     return convert_analysis_result((regress.slope, regress.intercept, regress.rvalue, regress.pvalue, regress.stderr))
+
+EMPTY_RESULTS = {
+    "pearson": (None, None),
+    "spearman": (None, None),
+    "kendalltau": (None, None),
+    "linregress": (None, None, None, None, None),
+}
+
+RANK_METHODS = ("spearman", "kendalltau")
+RANK_ENGINES = ("scipy", "subsample")
+RANK_SAMPLE_SIZE = int(os.environ.get("CORRELATION_RANK_SAMPLE_SIZE", 50_000))
+CONFIDENCE_LEVEL = 0.95
+
+def correlation_pvalue(r, n):
+    if n <= 2:
+        return 1.0
+    if abs(r) >= 1.0:
+        return 0.0
+    t_stat = r * np.sqrt((n - 2) / ((1.0 - r) * (1.0 + r)))
+    return 2 * t_dist.sf(abs(t_stat), n - 2)
+
+def _moments(x, y):
+    dx = x - x.mean()
+    dy = y - y.mean()
+    return dx @ dx, dy @ dy, dx @ dy
+
+def pearson_from_moments(sxx, syy, sxy, n):
+    if sxx == 0 or syy == 0:
+        return np.nan, np.nan
+    r = float(np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0))
+    return r, correlation_pvalue(r, n)
+
+def linregress_from_moments(mean_x, mean_y, sxx, syy, sxy, n):
+    if sxx == 0:
+        return np.nan, np.nan, np.nan, np.nan, np.nan
+    r = 0.0 if syy == 0 else float(np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0))
+    slope = sxy / sxx
+    intercept = mean_y - slope * mean_x
+    if n == 2:
+        pvalue = 1.0 if syy == 0 else 0.0
+        stderr = 0.0
+    else:
+        pvalue = correlation_pvalue(r, n)
+        stderr = np.sqrt((1 - r ** 2) * syy / sxx / (n - 2))
+    return slope, intercept, r, pvalue, stderr
+
+def stratified_sample_positions(n, size, seed: int = 0):
+    # One uniformly drawn position from each of `size` equal slices, so the
+    # sample covers the whole window evenly in time.
+    rng = np.random.default_rng(seed)
+    return np.floor((np.arange(size) + rng.random(size)) * (n / size)).astype(np.int64)
+
+def fisher_confidence_interval(r, variance):
+    if r is None or not np.isfinite(r) or not np.isfinite(variance) or variance <= 0:
+        return None, None
+    z = np.arctanh(np.clip(r, -1 + 1e-15, 1 - 1e-15))
+    half_width = norm.ppf(0.5 + CONFIDENCE_LEVEL / 2) * np.sqrt(variance)
+    return float(np.tanh(z - half_width)), float(np.tanh(z + half_width))
+
+def rank_confidence_interval(method, r, m):
+    # Fieller, Hartley & Pearson (1957) variances of atanh(r): 1.06 / (m - 3)
+    # for Spearman and 0.437 / (m - 4) for Kendall.
+    scale, dof = (1.06, 3) if method == "spearman" else (0.437, 4)
+    return fisher_confidence_interval(r, scale / (m - dof) if m > dof else np.nan)
+
+def correlation_analysis(target_values, comparison_values, methods, rank_engine: str = "scipy", rank_sample_size: int = RANK_SAMPLE_SIZE):
+    x = np.asarray(target_values, dtype=float)
+    y = np.asarray(comparison_values, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if not valid.all():
+        x, y = x[valid], y[valid]
+
+    methods = [method for method in EMPTY_RESULTS if method in methods]
+    rank_methods = [method for method in RANK_METHODS if method in methods]
+    n = len(x)
+
+    rank_x, rank_y = x, y
+    if rank_engine == "subsample" and n > rank_sample_size:
+        positions = stratified_sample_positions(n, rank_sample_size)
+        rank_x, rank_y = x[positions], y[positions]
+    rank_info = {"engine": rank_engine, "sample_size": len(rank_x), "confidence_intervals": {}}
+
+    if n < 2:
+        results = {method: EMPTY_RESULTS[method] for method in methods}
+        if rank_methods:
+            results["rank_engine"] = rank_info
+        return results
+
+    results = {}
+    if "pearson" in methods or "linregress" in methods:
+        with stage("stat_moments") as timing:
+            sxx, syy, sxy = _moments(x, y)
+            if "pearson" in methods:
+                results["pearson"] = convert_analysis_result(pearson_from_moments(sxx, syy, sxy, n))
+            if "linregress" in methods:
+                results["linregress"] = convert_analysis_result(linregress_from_moments(x.mean(), y.mean(), sxx, syy, sxy, n))
+            timing.record(n)
+
+    m = len(rank_x)
+    if "spearman" in methods:
+        with stage("stat_spearman") as timing:
+            x_ranks = rankdata(rank_x)
+            y_ranks = rankdata(rank_y)
+            results["spearman"] = convert_analysis_result(pearson_from_moments(*_moments(x_ranks, y_ranks), m))
+            timing.record(m)
+        if m < n:
+            rank_info["confidence_intervals"]["spearman"] = rank_confidence_interval("spearman", results["spearman"][0], m)
+
+    if "kendalltau" in methods:
+        with stage("stat_kendalltau") as timing:
+            results["kendalltau"] = convert_analysis_result(kendalltau(rank_x, rank_y))
+            timing.record(m)
+        if m < n:
+            rank_info["confidence_intervals"]["kendalltau"] = rank_confidence_interval("kendalltau", results["kendalltau"][0], m)
+
+    results = {method: results[method] for method in methods}
+    if rank_methods:
+        results["rank_engine"] = rank_info
+    return results
@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+import time
+
+from correlation_backend.logic.parquet_utils import read_file_info
+
+CATALOG_VERSION = 1
+REFRESH_INTERVAL_SECONDS = float(os.environ.get("CORRELATION_CATALOG_REFRESH_SECONDS", 10))
+
+
+class Catalog:
+    def __init__(self, data_folder: str, index_path: str = None, refresh_interval: float = REFRESH_INTERVAL_SECONDS):
+        self.data_folder = data_folder
+        self.index_path = index_path or os.environ.get("CORRELATION_CATALOG_PATH", os.path.join(data_folder, ".catalog.json"))
+        self.refresh_interval = refresh_interval
+        self._instruments = None
+        self._last_refresh = 0.0
+        self._lock = threading.RLock()
+
+    def instruments(self):
+        return self._index()
+
+    def instrument_names(self):
+        return sorted(self._index())
+
+    def match_instruments(self, instrument: str):
+        instrument = instrument.lower()
+        return [name for name in self.instrument_names() if instrument in name.lower()]
+
+    def find_instrument(self, instrument: str):
+        names = self.instrument_names()
+        if instrument in names:
+            return instrument
+        return next((name for name in names if instrument.lower() == name.lower()), None)
+
+    def datatype_names(self, instrument: str):
+        return sorted(self._index().get(instrument, {}))
+
+    def match_datatypes(self, instrument: str, data_type: str):
+        data_type = data_type.lower()
+        return [name for name in self.datatype_names(instrument) if data_type in name.lower()]
+
+    def files(self, instrument: str, data_type: str):
+        return self._index().get(instrument, {}).get(data_type, [])
+
+    def columns(self, instrument: str, data_type: str):
+        files = self.files(instrument, data_type)
+        if not files:
+            return []
+        common = set(files[0]['columns']).intersection(*(entry['columns'] for entry in files[1:]))
+        return [column for column in files[0]['columns'] if column in common]
+
+    def timestamp_range(self, instrument: str, data_type: str):
+        files = [entry for entry in self.files(instrument, data_type) if entry['min_timestamp'] is not None]
+        if not files:
+            return None
+        return {
+            'min_timestamp': min(entry['min_timestamp'] for entry in files),
+            'max_timestamp': max(entry['max_timestamp'] for entry in files)
+        }
+
+    def file_path(self, entry):
+        return os.path.join(self.data_folder, entry['path'])
+
+    def rescan(self, full: bool = False):
+        self._refresh(full)
+        return self.summary()
+
+    def summary(self):
+        instruments = self._index()
+        datatypes = [files for datatypes in instruments.values() for files in datatypes.values()]
+        return {
+            "instruments": len(instruments),
+            "datatypes": len(datatypes),
+            "files": sum(len(files) for files in datatypes),
+            "bytes": sum(entry['size'] for files in datatypes for entry in files),
+        }
+
+    def _index(self):
+        with self._lock:
+            if self._instruments is None or time.monotonic() - self._last_refresh > self.refresh_interval:
+                self._refresh()
+            return self._instruments
+
+    def _refresh(self, full: bool = False):
+        with self._lock:
+            if self._instruments is None and not full:
+                self._load()
+            previous = {} if full else self._previous_entries()
+            instruments = self._scan(previous)
+            changed = instruments != self._instruments
+            self._instruments = instruments
+            self._last_refresh = time.monotonic()
+            if changed or full:
+                self._persist()
+
+    def _previous_entries(self):
+        previous = {}
+        for datatypes in (self._instruments or {}).values():
+            for files in datatypes.values():
+                for entry in files:
+                    previous[entry['path']] = entry
+        return previous
+
+    def _scan(self, previous):
+        instruments = {}
+        if not os.path.isdir(self.data_folder):
+            return instruments
+
+        for instrument in os.listdir(self.data_folder):
+            instrument_path = os.path.join(self.data_folder, instrument)
+            if not os.path.isdir(instrument_path):
+                continue
+
+            datatypes = {}
+            for data_type in os.listdir(instrument_path):
+                data_type_path = os.path.join(instrument_path, data_type)
+                if os.path.isdir(data_type_path):
+                    datatypes[data_type] = self._scan_datatype(data_type_path, previous)
+            instruments[instrument] = datatypes
+
+        return instruments
+
+    def _scan_datatype(self, data_type_path, previous):
+        files = []
+        for dirpath, dirnames, filenames in os.walk(data_type_path):
+            dirnames[:] = sorted(name for name in dirnames if not name.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.startswith('.') or filename.startswith('_'):
+                    continue
+
+                entry = self._file_entry(os.path.join(dirpath, filename), previous)
+                if entry is not None:
+                    files.append(entry)
+
+        files.sort(key=lambda entry: (entry['min_timestamp'] is None, entry['min_timestamp'] or 0, entry['path']))
+        return files
+
+    def _file_entry(self, file_path, previous):
+        relative_path = os.path.relpath(file_path, self.data_folder)
+        stat = os.stat(file_path)
+
+        entry = previous.get(relative_path)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry
+
+        try:
+            info = read_file_info(file_path)
+        except Exception:
+            return None
+
+        return {
+            'path': relative_path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            **info,
+        }
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if stored.get('version') == CATALOG_VERSION and stored.get('data_folder') == os.path.abspath(self.data_folder):
+            self._instruments = stored.get('instruments', {})
+
+    def _persist(self):
+        stored = {
+            'version': CATALOG_VERSION,
+            'data_folder': os.path.abspath(self.data_folder),
+            'instruments': self._instruments,
+        }
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
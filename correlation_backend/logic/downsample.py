@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x, y, max_points):
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    # Largest-Triangle-Three-Buckets: first and last points are kept, every
+    # bucket in between contributes the point forming the largest triangle with
+    # the previously selected point and the mean of the next bucket.
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start = end
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def minmax_indices(y, max_points):
+    n = len(y)
+    if max_points >= n or max_points < 2:
+        return np.arange(n)
+
+    buckets = np.arange(n) * (max_points // 2) // n
+    order = np.lexsort((y, buckets))
+    sorted_buckets = buckets[order]
+    first = np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]]
+    last = np.r_[sorted_buckets[1:] != sorted_buckets[:-1], True]
+    return np.unique(np.concatenate((order[first], order[last])))
+
+
+def downsample_series(series: pd.Series, max_points: int, method: str = "lttb"):
+    if series is None or max_points is None or len(series) <= max_points:
+        return series
+
+    values = series.to_numpy(dtype=float)
+    finite = np.isfinite(values)
+    if not finite.all():
+        series = series[finite]
+        values = values[finite]
+        if len(series) <= max_points:
+            return series
+
+    if method == "minmax":
+        indices = minmax_indices(values, max_points)
+    else:
+        x = series.index.to_numpy(dtype=float)
+        indices = lttb_indices(x - x[0], values, max_points)
+
+    return series.iloc[indices]
@@ -0,0 +1,58 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("CORRELATION_MAX_CONCURRENT_REQUESTS", 4))
+MAX_QUEUED_REQUESTS = int(os.environ.get("CORRELATION_MAX_QUEUED_REQUESTS", 16))
+MAX_WORKERS = int(os.environ.get("CORRELATION_MAX_WORKERS", os.cpu_count() or 4))
+
+
+class AnalysisExecutor:
+    # Requests run on their own bounded pool; the per-series work they fan out
+    # goes to a separate worker pool so a request never waits on a slot held
+    # by itself. Threads are enough here because pandas, numpy, scipy and
+    # pyarrow release the GIL in their heavy loops.
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_REQUESTS, max_queued: int = MAX_QUEUED_REQUESTS, max_workers: int = MAX_WORKERS):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.rejected = 0
+        self._request_pool = ThreadPoolExecutor(max_concurrent, thread_name_prefix="analysis-request")
+        self._worker_pool = ThreadPoolExecutor(max_workers, thread_name_prefix="analysis-worker")
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.max_concurrent + self.max_queued:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Analysis queue is full, retry later", headers={"Retry-After": "1"})
+
+        self.in_flight += 1
+        try:
+            # run_in_executor doesn't carry context variables over, so the
+            # request trace would be lost without running inside a copy.
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(self._request_pool, functools.partial(context.run, fn, *args))
+        finally:
+            self.in_flight -= 1
+
+    def map(self, fn, items):
+        items = list(items)
+        if len(items) < 2:
+            return [fn(item) for item in items]
+        context = contextvars.copy_context()
+        return list(self._worker_pool.map(lambda item: context.copy().run(fn, item), items))
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "running": min(self.in_flight, self.max_concurrent),
+            "queued": max(self.in_flight - self.max_concurrent, 0),
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "rejected": self.rejected,
+        }
+
+
+analysis_executor = AnalysisExecutor()
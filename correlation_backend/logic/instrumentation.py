@@ -0,0 +1,174 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+
+INSTRUMENTATION_ENABLED = os.environ.get("CORRELATION_INSTRUMENTATION", "").lower() in ("1", "true", "yes")
+SERVER_TIMING_ENABLED = os.environ.get("CORRELATION_SERVER_TIMING", "1" if INSTRUMENTATION_ENABLED else "").lower() in ("1", "true", "yes")
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger("correlation_backend")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.environ.get("CORRELATION_LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, exc_info: bool = False, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps({"event": event, **fields}, default=str), exc_info=exc_info)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: tuple, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (bucket_counts, total, count) in sorted(self._series.items()):
+                label_text = ",".join(f'{name}="{label_value}"' for name, label_value in zip(self.label_names, labels))
+                prefix = f"{label_text}," if label_text else ""
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+                lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                label_text = ",".join(f'{name}="{label_value}"' for name, label_value in zip(self.label_names, labels))
+                lines.append(f"{self.name}{{{label_text}}} {value}")
+        return lines
+
+
+request_seconds = Histogram("correlation_request_seconds", "Request latency by endpoint.", ("endpoint", "status"))
+stage_seconds = Histogram("correlation_stage_seconds", "Pipeline stage latency.", ("stage",))
+stage_rows = Counter("correlation_stage_rows_total", "Rows processed per pipeline stage.", ("stage",))
+stage_bytes = Counter("correlation_stage_bytes_total", "Bytes read or written per pipeline stage.", ("stage",))
+response_bytes = Counter("correlation_response_bytes_total", "Response payload bytes by endpoint.", ("endpoint",))
+METRICS = (request_seconds, stage_seconds, stage_rows, stage_bytes, response_bytes)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestTrace:
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, rows: int, nbytes: int):
+        with self._lock:
+            totals = self.stages.setdefault(name, {"seconds": 0.0, "count": 0, "rows": 0, "bytes": 0})
+            totals["seconds"] += seconds
+            totals["count"] += 1
+            totals["rows"] += rows
+            totals["bytes"] += nbytes
+
+    def server_timing(self):
+        with self._lock:
+            return ", ".join(f"{name};dur={totals['seconds'] * 1000:.2f}" for name, totals in self.stages.items())
+
+
+_current_trace = contextvars.ContextVar("correlation_request_trace", default=None)
+
+
+def start_trace():
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+class _Stage:
+    __slots__ = ("name", "rows", "bytes", "_start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.bytes = 0
+
+    def record(self, rows: int = 0, nbytes: int = 0):
+        self.rows += rows
+        self.bytes += nbytes
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        stage_seconds.observe(seconds, self.name)
+        if self.rows:
+            stage_rows.inc(self.rows, self.name)
+        if self.bytes:
+            stage_bytes.inc(self.bytes, self.name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(self.name, seconds, self.rows, self.bytes)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def record(self, rows: int = 0, nbytes: int = 0):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name: str):
+    if not INSTRUMENTATION_ENABLED:
+        return _NULL_STAGE
+    return _Stage(name)
@@ -0,0 +1,161 @@
+import os
+import threading
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from correlation_backend.logic.instrumentation import log_event
+from correlation_backend.logic.result_cache import payload_nbytes
+
+MAX_RUNNING_JOBS = int(os.environ.get("CORRELATION_MAX_RUNNING_JOBS", 2))
+JOB_RESULT_TTL_SECONDS = float(os.environ.get("CORRELATION_JOB_RESULT_TTL_SECONDS", 3600))
+MAX_FINISHED_JOBS = int(os.environ.get("CORRELATION_MAX_FINISHED_JOBS", 100))
+JOB_RESULT_MAX_BYTES = int(os.environ.get("CORRELATION_JOB_RESULT_BYTES", 256 * 1024 * 1024))
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id: str, args: tuple = (), fingerprint: str = None):
+        self.id = job_id
+        self.args = args
+        self.fingerprint = fingerprint
+        self.status = "queued"
+        self.stage = None
+        self.completed = 0
+        self.total = None
+        self.result = None
+        self.result_nbytes = 0
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def set_stage(self, stage: str, total: int = None):
+        self.check_cancelled()
+        self.stage = stage
+        if total is not None:
+            self.total = total
+            self.completed = 0
+
+    def advance(self):
+        with self._lock:
+            self.completed += 1
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel_event.set()
+        if self.status == "queued":
+            self.status = "cancelled"
+            self.finished_at = time.time()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": {"completed": self.completed, "total": self.total},
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    def __init__(self, max_running: int = MAX_RUNNING_JOBS, result_ttl: float = JOB_RESULT_TTL_SECONDS,
+                 max_finished: int = MAX_FINISHED_JOBS, max_result_bytes: int = JOB_RESULT_MAX_BYTES):
+        self.result_ttl = result_ttl
+        self.max_finished = max_finished
+        self.max_result_bytes = max_result_bytes
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_running, thread_name_prefix="analysis-job")
+
+    def submit(self, fn, *args, fingerprint: str = None):
+        with self._lock:
+            self._evict()
+            if fingerprint is not None:
+                for job in self._jobs.values():
+                    if job.fingerprint == fingerprint and job.status in ("queued", "running", "completed"):
+                        self._jobs.move_to_end(job.id)
+                        return job
+
+            job = Job(uuid.uuid4().hex, args, fingerprint)
+            self._jobs[job.id] = job
+
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs.move_to_end(job_id)
+            return job
+
+    def cancel(self, job_id: str):
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel()
+        return job
+
+    def _run(self, job: Job, fn):
+        if job.finished:
+            return
+
+        job.status = "running"
+        job.started_at = time.time()
+        status = "completed"
+        try:
+            job.result = fn(job, *job.args)
+            job.result_nbytes = payload_nbytes(job.result)
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            log_event("job_failed", logging.ERROR, exc_info=True, job_id=job.id, error=str(e))
+            job.error = str(e)
+            status = "failed"
+
+        # finished_at is set first so a job is never seen finished without it
+        job.finished_at = time.time()
+        job.status = status
+        with self._lock:
+            self._jobs.move_to_end(job.id)
+            self._evict()
+
+    def _evict(self):
+        # Finished jobs leave when their result expires, and least recently
+        # used first while there are too many of them or their results hold
+        # too much memory. Queued and running jobs are never evicted, nor is
+        # the most recently used result, even if it alone is over budget.
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.finished]
+        remaining = len(finished)
+        result_bytes = sum(job.result_nbytes for job in finished)
+        for job in finished:
+            expired = now - job.finished_at > self.result_ttl
+            over_budget = remaining > 1 and (remaining > self.max_finished or result_bytes > self.max_result_bytes)
+            if not (expired or over_budget):
+                continue
+            del self._jobs[job.id]
+            remaining -= 1
+            result_bytes -= job.result_nbytes
+
+
+job_manager = JobManager()
@@ -3,24 +3,27 @@ import numpy as np
 from datetime import datetime
 
 
-def series_to_timeseries_array(series: pd.Series):
+def finite_timeseries_arrays(series: pd.Series):
     if series is None or len(series) == 0:
-        return []
-    
-    result = []
-    for idx, val in series.items():
-        try:
-            ts = int(idx)
-            value = float(val)
-            
-            if np.isnan(value) or np.isinf(value):
-                continue
-                
-            result.append({"timestamp": ts, "value": value})
-        except Exception:
-            continue
-    
-    return result
+        return np.array([], dtype=np.int64), np.array([], dtype=float)
+
+    if series.dtype == 'object':
+        series = pd.to_numeric(series, errors='coerce')
+
+    values = series.to_numpy(dtype=float)
+    mask = np.isfinite(values)
+    timestamps = series.index.to_numpy()[mask].astype(np.int64)
+    return timestamps, values[mask]
+
+
+def series_to_timeseries_array(series: pd.Series):
+    timestamps, values = finite_timeseries_arrays(series)
+    return [{"timestamp": ts, "value": value} for ts, value in zip(timestamps.tolist(), values.tolist())]
+
+
+def series_to_columns(series: pd.Series):
+    timestamps, values = finite_timeseries_arrays(series)
+    return {"timestamps": timestamps.tolist(), "values": values.tolist()}
 
 
 def convert_analysis_result(result):
@@ -0,0 +1,129 @@
+import os
+import numpy as np
+from scipy.fft import irfft, next_fast_len, rfft
+from scipy.stats import rankdata
+from correlation_backend.logic.calc_analysis import correlation_pvalue
+from correlation_backend.logic.read_data import sorted_timestamps_and_values
+
+LAG_SCAN_METHODS = ("pearson", "spearman")
+# Spearman ranks once over the whole window, not over each lag's pairs.
+APPROXIMATE_LAG_SCAN_METHODS = ("spearman",)
+MAX_LAG_SPAN = int(os.environ.get("CORRELATION_MAX_LAG_SPAN", 100_000))
+
+
+# Offsets follow align_series_with_offset: a positive lag k pairs each target
+# timestamp with the k-th comparison row strictly after it, a negative lag with
+# the |k|-th row strictly before it. For a fixed base position per target row
+# every lagged sum is a cross-correlation of per-position aggregates with the
+# comparison values, so all lags are computed together with a handful of FFTs.
+def _shifted_sums(base, x, y, y_valid, shifts, m):
+    size = next_fast_len(2 * m + 1)
+    count_fft = rfft(np.bincount(base, minlength=m + 1), size)
+    x_fft = rfft(np.bincount(base, weights=x, minlength=m + 1), size)
+    xx_fft = rfft(np.bincount(base, weights=x * x, minlength=m + 1), size)
+    # Beyond m rows either way no target row has a partner, and the circular
+    # transform would wrap those shifts onto real ones.
+    reachable = np.abs(shifts) <= m
+
+    def correlate(weights_fft, values):
+        values_fft = rfft(values, size)
+        return np.where(reachable, irfft(np.conj(weights_fft) * values_fft, size)[shifts % size], 0.0)
+
+    valid = y_valid.astype(float)
+    n = np.rint(correlate(count_fft, valid))
+    sum_x = correlate(x_fft, valid)
+    sum_xx = correlate(xx_fft, valid)
+    sum_y = correlate(count_fft, y)
+    sum_yy = correlate(count_fft, y * y)
+    sum_xy = correlate(x_fft, y)
+    return n, sum_x, sum_xx, sum_y, sum_yy, sum_xy
+
+
+def _exact_match_sums(target_timestamps, x, comparison_timestamps, y, y_valid):
+    positions = np.searchsorted(comparison_timestamps, target_timestamps, side='left')
+    found = positions < len(comparison_timestamps)
+    found[found] = comparison_timestamps[positions[found]] == target_timestamps[found]
+    positions = positions[found]
+    matched = y_valid[positions]
+    xs = x[found][matched]
+    ys = y[positions][matched]
+    return len(xs), xs.sum(), xs @ xs, ys.sum(), ys @ ys, xs @ ys
+
+
+def _standardize(values, valid):
+    centered = np.where(valid, values - values[valid].mean(), 0.0)
+    scale = np.sqrt((centered ** 2).sum() / max(valid.sum(), 1))
+    return centered / scale if scale > 0 else centered
+
+
+def lagged_correlation(target_timestamps, x, comparison_timestamps, y, lags):
+    lags = np.asarray(lags)
+    y_valid = ~np.isnan(y)
+    if len(x) == 0 or not y_valid.any():
+        return np.full(len(lags), np.nan), np.zeros(len(lags), dtype=int)
+
+    x = _standardize(x, np.ones(len(x), dtype=bool))
+    y = _standardize(y, y_valid)
+    m = len(comparison_timestamps)
+
+    sums = np.zeros((6, len(lags)))
+    positive = lags > 0
+    negative = lags < 0
+    if positive.any():
+        base = np.searchsorted(comparison_timestamps, target_timestamps, side='right')
+        sums[:, positive] = _shifted_sums(base, x, y, y_valid, lags[positive] - 1, m)
+    if negative.any():
+        base = np.searchsorted(comparison_timestamps, target_timestamps, side='left')
+        sums[:, negative] = _shifted_sums(base, x, y, y_valid, lags[negative], m)
+    if (~positive & ~negative).any():
+        sums[:, ~positive & ~negative] = np.array(_exact_match_sums(target_timestamps, x, comparison_timestamps, y, y_valid))[:, None]
+
+    n, sum_x, sum_xx, sum_y, sum_yy, sum_xy = sums
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_x = n * sum_xx - sum_x ** 2
+        var_y = n * sum_yy - sum_y ** 2
+        coefficients = (n * sum_xy - sum_x * sum_y) / np.sqrt(var_x * var_y)
+    # FFT round-off leaves a constant side with a tiny variance instead of zero
+    constant = (var_x <= 1e-9 * n * sum_xx) | (var_y <= 1e-9 * n * sum_yy)
+    coefficients[(n < 2) | constant] = np.nan
+    return np.clip(coefficients, -1.0, 1.0), n.astype(int)
+
+
+def _finite_or_none(values):
+    return [float(v) if np.isfinite(v) else None for v in values]
+
+
+def lag_scan(target_series, comparison_series, lags, method="pearson"):
+    lags = np.asarray(lags)
+    target_timestamps, target_values = sorted_timestamps_and_values(target_series)
+    comparison_timestamps, comparison_values = sorted_timestamps_and_values(comparison_series)
+    x = np.asarray(target_values, dtype=float)
+    y = np.array(comparison_values, dtype=float)
+
+    target_valid = ~np.isnan(x)
+    target_timestamps, x = target_timestamps[target_valid], x[target_valid]
+
+    if method == "spearman":
+        # Ranks are taken once over the whole window rather than per lag, so
+        # rows dropped at the edges of a lag do not trigger a re-rank.
+        x = rankdata(x)
+        y_valid = ~np.isnan(y)
+        y[y_valid] = rankdata(y[y_valid])
+
+    coefficients, n_obs = lagged_correlation(target_timestamps, x, comparison_timestamps, y, lags)
+    p_values = np.array([correlation_pvalue(r, n) if np.isfinite(r) else np.nan for r, n in zip(coefficients, n_obs)])
+
+    best_lag = None
+    best_coefficient = None
+    if np.isfinite(coefficients).any():
+        best = int(np.nanargmax(np.abs(coefficients)))
+        best_lag = int(lags[best])
+        best_coefficient = float(coefficients[best])
+
+    return {
+        "coefficients": _finite_or_none(coefficients),
+        "p_values": _finite_or_none(p_values),
+        "n_obs": n_obs.tolist(),
+        "best_lag": best_lag,
+        "best_coefficient": best_coefficient,
+    }
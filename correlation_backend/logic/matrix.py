@@ -0,0 +1,136 @@
+import os
+import numpy as np
+from scipy.stats import rankdata
+from scipy.stats import t as t_dist
+from correlation_backend.logic.read_data import sorted_timestamps_and_values
+
+MATRIX_METHODS = ("pearson", "spearman")
+# Grid cells (rows x series) filled at a time; the working set is about five
+# float arrays of this size however long the union of timestamps gets.
+MATRIX_BLOCK_CELLS = int(os.environ.get("CORRELATION_MATRIX_BLOCK_CELLS", 4 * 1024 * 1024))
+
+
+def series_columns(series_list):
+    # Sorted (timestamps, values) per series, keeping the last value recorded
+    # for a duplicated timestamp.
+    columns = []
+    for series in series_list:
+        timestamps, values = sorted_timestamps_and_values(series)
+        last = np.append(timestamps[1:] != timestamps[:-1], True) if len(timestamps) else np.array([], dtype=bool)
+        columns.append((timestamps[last], np.asarray(values[last], dtype=float)))
+    return columns
+
+
+def common_grid(columns):
+    if not columns:
+        return np.array([], dtype=np.int64)
+    return np.unique(np.concatenate([timestamps for timestamps, _ in columns]))
+
+
+def shares_timestamps(series_list):
+    first = None
+    for series in series_list:
+        timestamps = np.unique(series.index.to_numpy())
+        if first is None:
+            first = timestamps
+        elif not np.array_equal(first, timestamps):
+            return False
+    return True
+
+
+def grid_blocks(grid, columns, block_cells: int = MATRIX_BLOCK_CELLS):
+    # The dense (grid x series) matrix a block of grid rows at a time, NaN
+    # where a series has no value.
+    block_rows = max(block_cells // max(len(columns), 1), 1)
+    for start in range(0, len(grid), block_rows):
+        block_grid = grid[start:start + block_rows]
+        values = np.full((len(block_grid), len(columns)), np.nan)
+        for j, (timestamps, column_values) in enumerate(columns):
+            lower = np.searchsorted(timestamps, block_grid[0], side='left')
+            upper = np.searchsorted(timestamps, block_grid[-1], side='right')
+            values[np.searchsorted(block_grid, timestamps[lower:upper]), j] = column_values[lower:upper]
+        yield values
+
+
+def _rank_columns(columns):
+    ranked = []
+    for timestamps, values in columns:
+        ranks = np.full_like(values, np.nan)
+        valid = ~np.isnan(values)
+        ranks[valid] = rankdata(values[valid])
+        ranked.append((timestamps, ranks))
+    return ranked
+
+
+def pairwise_correlation(grid, columns, min_periods: int = 3, block_cells: int = MATRIX_BLOCK_CELLS):
+    num_series = len(columns)
+    dense = all(len(timestamps) == len(grid) and not np.isnan(values).any() for timestamps, values in columns)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if dense:
+            n = np.full((num_series, num_series), float(len(grid)))
+            r = np.corrcoef(np.column_stack([values for _, values in columns]), rowvar=False).reshape(num_series, num_series)
+        else:
+            # Pairwise-complete moments from a few matrix products per block:
+            # entry [i, j] of each product only sums rows where both i and j
+            # exist, because missing values are zeroed and masked by the weights.
+            means = np.array([values[~np.isnan(values)].mean() if (~np.isnan(values)).any() else 0.0 for _, values in columns])
+            n = sum_x = sum_xx = sum_xy = 0.0
+            for values in grid_blocks(grid, columns, block_cells):
+                valid = ~np.isnan(values)
+                weights = valid.astype(float)
+                x = np.where(valid, values - means, 0.0)
+                n = n + weights.T @ weights
+                sum_x = sum_x + x.T @ weights
+                sum_xx = sum_xx + (x * x).T @ weights
+                sum_xy = sum_xy + x.T @ x
+            cov = sum_xy - sum_x * sum_x.T / n
+            var = np.maximum(sum_xx - sum_x ** 2 / n, 0.0)
+            r = cov / np.sqrt(var * var.T)
+
+    r = np.clip(r, -1.0, 1.0)
+    r[n < min_periods] = np.nan
+    return r, n
+
+
+def correlation_pvalues(r, n):
+    df = n - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_stat = r * np.sqrt(df / ((1.0 - r) * (1.0 + r)))
+        p_values = 2 * t_dist.sf(np.abs(t_stat), np.maximum(df, 1))
+    p_values = np.where(np.abs(r) >= 1.0, 0.0, p_values)
+    p_values = np.where(n <= 2, 1.0, p_values)
+    p_values[np.isnan(r)] = np.nan
+    return p_values
+
+
+def _matrix_to_list(matrix):
+    return np.where(np.isfinite(matrix), matrix, None).tolist()
+
+
+def correlation_matrix(series_list, methods, min_periods: int = 3, block_cells: int = MATRIX_BLOCK_CELLS):
+    columns = series_columns(series_list)
+    grid = common_grid(columns)
+    has_gaps = any(len(timestamps) < len(grid) or np.isnan(values).any() for timestamps, values in columns)
+
+    results = {}
+    n = None
+    for method in methods:
+        if method not in MATRIX_METHODS:
+            continue
+
+        # Spearman ranks each series over its own observations; with gaps this
+        # differs slightly from re-ranking every pair on its common rows.
+        method_columns = _rank_columns(columns) if method == "spearman" else columns
+        r, n = pairwise_correlation(grid, method_columns, min_periods, block_cells)
+        results[method] = {
+            "coefficients": _matrix_to_list(r),
+            "p_values": _matrix_to_list(correlation_pvalues(r, n)),
+        }
+
+    return {
+        "grid_points": len(grid),
+        "n_obs": n.astype(int).tolist() if n is not None else None,
+        "approximate_methods": ["spearman"] if has_gaps and "spearman" in results else [],
+        **results
+    }
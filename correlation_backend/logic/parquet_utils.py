@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+TIMESTAMP_COLUMNS = ('ts_event', 'ts_init', 'timestamp')
+
+
+def find_timestamp_column(columns):
+    for timestamp_column in TIMESTAMP_COLUMNS:
+        if timestamp_column in columns:
+            return timestamp_column
+    return None
+
+
+def timestamp_to_int(value):
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).value)
+
+
+def schema_columns(schema):
+    pandas_metadata = schema.pandas_metadata or {}
+    index_columns = {column for column in pandas_metadata.get('index_columns', []) if isinstance(column, str)}
+    return [name for name in schema.names if name not in index_columns]
+
+
+def file_columns(file_path):
+    return schema_columns(pq.read_schema(file_path))
+
+
+def row_group_timestamp_bounds(parquet_file: pq.ParquetFile, timestamp_column: str):
+    # (min, max) of the timestamp column per row group, or None where the
+    # statistics can't tell (missing, or the row group is empty or all null).
+    metadata = parquet_file.metadata
+    column_index = next(
+        (i for i in range(metadata.num_columns) if metadata.schema.column(i).path == timestamp_column),
+        None
+    )
+
+    bounds = []
+    for row_group_index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(row_group_index)
+        statistics = row_group.column(column_index).statistics if column_index is not None else None
+        if row_group.num_rows == 0 or statistics is None or not statistics.has_min_max or (statistics.has_null_count and statistics.null_count == row_group.num_rows):
+            bounds.append(None)
+        else:
+            bounds.append((timestamp_to_int(statistics.min), timestamp_to_int(statistics.max)))
+    return bounds
+
+
+def parquet_timestamp_range(parquet_file: pq.ParquetFile):
+    timestamp_column = find_timestamp_column(parquet_file.schema_arrow.names)
+    if not timestamp_column:
+        return None
+
+    metadata = parquet_file.metadata
+    min_timestamp = None
+    max_timestamp = None
+    for row_group_index, bounds in enumerate(row_group_timestamp_bounds(parquet_file, timestamp_column)):
+        if metadata.row_group(row_group_index).num_rows == 0:
+            continue
+
+        if bounds is None:
+            min_timestamp = max_timestamp = None
+            break
+
+        row_group_min, row_group_max = bounds
+        min_timestamp = row_group_min if min_timestamp is None else min(min_timestamp, row_group_min)
+        max_timestamp = row_group_max if max_timestamp is None else max(max_timestamp, row_group_max)
+
+    if min_timestamp is None:
+        timestamps = parquet_file.read(columns=[timestamp_column]).column(0)
+        bounds = pc.min_max(timestamps).as_py()
+        if bounds['min'] is None:
+            return None
+        min_timestamp = timestamp_to_int(bounds['min'])
+        max_timestamp = timestamp_to_int(bounds['max'])
+
+    return {
+        'min_timestamp': min_timestamp,
+        'max_timestamp': max_timestamp
+    }
+
+
+def file_timestamp_range(file_path):
+    return parquet_timestamp_range(pq.ParquetFile(file_path))
+
+
+def read_file_info(file_path):
+    parquet_file = pq.ParquetFile(file_path)
+    columns = schema_columns(parquet_file.schema_arrow)
+    timestamp_range = parquet_timestamp_range(parquet_file) or {}
+    return {
+        'columns': columns,
+        'timestamp_column': find_timestamp_column(parquet_file.schema_arrow.names),
+        'min_timestamp': timestamp_range.get('min_timestamp'),
+        'max_timestamp': timestamp_range.get('max_timestamp'),
+        'num_rows': parquet_file.metadata.num_rows,
+    }
@@ -1,46 +1,96 @@
 import os
-from os import path, listdir
 import pandas as pd
 import struct
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from correlation_backend.logic.catalog import Catalog
+from correlation_backend.logic.instrumentation import stage
+from correlation_backend.logic.parquet_utils import find_timestamp_column
+from correlation_backend.logic.series_cache import file_version, series_cache
 
-data_folder = "data"
+data_folder = os.environ.get("CORRELATION_DATA_FOLDER", "data")
+catalog = Catalog(data_folder)
 
 def get_available_instruments():
-    instruments = []
-    if not os.path.exists(data_folder):
-        return instruments
-    
-    for foldername in listdir(data_folder):
-        folder_path = path.join(data_folder, foldername)
-        if os.path.isdir(folder_path):
-            instruments.append(foldername)
-    
-    return sorted(instruments)
+    return catalog.instrument_names()
 
 def get_available_datatypes(instrument: str):
-    datatypes = []
     if not instrument:
-        return datatypes
-    
-    instrument_folder = None
+        return []
     
-    for foldername in listdir(data_folder):
-        if instrument == foldername or instrument.lower() == foldername.lower():
-            instrument_folder = path.join(data_folder, foldername)
-            break
+    instrument_folder = catalog.find_instrument(instrument)
+    if instrument_folder is None:
+        return []
     
-    if instrument_folder is None or not os.path.exists(instrument_folder):
-        return datatypes
-    
-    for subfolder in listdir(instrument_folder):
-        subfolder_path = path.join(instrument_folder, subfolder)
-        if os.path.isdir(subfolder_path):
-            datatypes.append(subfolder)
-    
-    return sorted(datatypes)
+    return catalog.datatype_names(instrument_folder)
+
+def rescan_catalog(full: bool = True):
+    return catalog.rescan(full)
+
+FIXED_POINT_RAW_PRECISION = 9
+# Decoded float64 value plus int64 timestamp index
+CACHED_ROW_BYTES = 16
+# A whole file's column is cached when it takes at most this share of the
+# series cache, or when the window covers at least this share of the file.
+WHOLE_FILE_CACHE_SHARE = 1 / 8
+WHOLE_FILE_WINDOW_SHARE = 0.5
+
+def _is_binary_type(data_type):
+    return pa.types.is_binary(data_type) or pa.types.is_large_binary(data_type) or pa.types.is_fixed_size_binary(data_type)
+
+def _decode_binary_chunk(array):
+    raw = np.zeros(len(array), dtype='<i8')
+    valid = np.ones(len(array), dtype=bool) if array.null_count == 0 else array.is_valid().to_numpy(zero_copy_only=False)
+
+    if pa.types.is_fixed_size_binary(array.type):
+        if array.type.byte_width != 8:
+            return np.full(len(array), np.nan)
+        data = np.frombuffer(array.buffers()[1], dtype='<i8')
+        raw[:] = data[array.offset:array.offset + len(array)]
+    else:
+        offset_dtype = np.int64 if pa.types.is_large_binary(array.type) else np.int32
+        offsets = np.frombuffer(array.buffers()[1], dtype=offset_dtype)[array.offset:array.offset + len(array) + 1]
+        valid &= np.diff(offsets) == 8
+        data = np.frombuffer(array.buffers()[2], dtype=np.uint8) if array.buffers()[2] is not None else np.empty(0, dtype=np.uint8)
+        starts = offsets[:-1][valid]
+        if valid.all():
+            # Every value is exactly 8 bytes, so the values buffer already is a
+            # contiguous little-endian int64 array.
+            raw[:] = data[offsets[0]:offsets[0] + 8 * len(array)].view('<i8')
+        else:
+            raw[valid] = data[starts[:, None] + np.arange(8)].view('<i8').ravel()
+
+    values = raw.astype(float)
+    values[~valid] = np.nan
+    return values
+
+def decode_binary_array(array, precision: int = None):
+    if isinstance(array, pa.ChunkedArray):
+        chunks = [_decode_binary_chunk(chunk) for chunk in array.chunks]
+        values = np.concatenate(chunks) if chunks else np.array([], dtype=float)
+    else:
+        values = _decode_binary_chunk(array)
+
+    if precision is not None:
+        values = np.round(values / 10 ** FIXED_POINT_RAW_PRECISION, precision)
+    return values
+
+def fixed_point_precision(schema, data_column: str):
+    metadata = schema.metadata or {}
+    if data_column == 'volume' or 'size' in data_column:
+        precision = metadata.get(b'size_precision')
+    else:
+        precision = metadata.get(b'price_precision')
+    return int(precision) if precision is not None else None
+
+def decode_binary_column(series, precision: int = None):
+    # Only an all-bytes column goes through Arrow: pa.binary() would also
+    # accept str values and decode their UTF-8 bytes instead of parsing them.
+    if pd.api.types.infer_dtype(series, skipna=True) == 'bytes':
+        array = pa.array(series.to_numpy(dtype=object), type=pa.binary(), from_pandas=True)
+        return pd.Series(decode_binary_array(array, precision), index=series.index, name=series.name)
 
-def decode_binary_column(series):
     def decode_value(val):
         if pd.isna(val):
             return None
@@ -52,161 +102,263 @@ def decode_binary_column(series):
             return float(val)
         return None
     
-    return series.apply(decode_value)
+    decoded = series.apply(decode_value)
+    if precision is not None:
+        decoded = (decoded / 10 ** FIXED_POINT_RAW_PRECISION).round(precision)
+    return decoded
+
+def column_values(array, schema, data_column: str):
+    if _is_binary_type(array.type):
+        return decode_binary_array(array, fixed_point_precision(schema, data_column))
+
+    values = array.to_pandas()
+    if not pd.api.types.is_numeric_dtype(values):
+        first_non_null = values.dropna().iloc[0] if len(values.dropna()) > 0 else None
+        if isinstance(first_non_null, bytes):
+            values = decode_binary_column(values)
+        else:
+            values = pd.to_numeric(values, errors='coerce')
+    return values.to_numpy(dtype=float, na_value=np.nan)
 
 def get_available_data_columns(instruments: list[str], data_types: list[str]):
     data_column_list = []
     for instrument in instruments:
         for data_type in data_types:
-            instrument = instrument.lower()
-            data_type = data_type.lower()
-
-            instrument_folder = None
-            
-            for foldername in listdir(data_folder):
-                if instrument in foldername.lower():
-                    instrument_folder = path.join(data_folder, foldername)
-                    break
-            
-            if instrument_folder is None:
+            instrument_folders = catalog.match_instruments(instrument)
+            if not instrument_folders:
                 continue
 
-            for data_type_folder in listdir(instrument_folder):
-                if data_type not in data_type_folder.lower():
+            for data_type_folder in catalog.match_datatypes(instrument_folders[0], data_type):
+                columns = catalog.columns(instrument_folders[0], data_type_folder)
+                if not columns:
                     continue
                 
-                data_type_folder_path = path.join(instrument_folder, data_type_folder)
-                file_path = listdir(data_type_folder_path)[0]
-                file_path = path.join(data_type_folder_path, file_path)
-                df = pd.read_parquet(file_path)
-                
                 if not data_column_list:
-                    data_column_list = list(df.columns)
+                    data_column_list = list(columns)
                 else:
-                    data_column_list = list(set(data_column_list) & set(df.columns))
+                    data_column_list = list(set(data_column_list) & set(columns))
 
     return data_column_list
 
-def get_target_data_by_instrument(instrument: str, data_type: str, data_column: str):
-
-    instrument = instrument.lower()
-    data_type = data_type.lower()
-
-    for foldername in os.listdir(data_folder):
-        if instrument in foldername.lower():
-            folder_path = os.path.join(data_folder, foldername)
-            for subfolder in os.listdir(folder_path):
-                if data_type in subfolder.lower():
-                    exact_folder_path = os.path.join(folder_path, subfolder)
-
-                    filename = os.listdir(exact_folder_path)[0]
-                    df = pd.read_parquet(os.path.join(exact_folder_path, filename))
-                    
-                    if 'ts_event' in df.columns:
-                        df = df.set_index('ts_event')
-                    elif 'ts_init' in df.columns:
-                        df = df.set_index('ts_init')
-                    elif 'timestamp' in df.columns:
-                        df = df.set_index('timestamp')
-                    
-                    if data_column in df.columns:
-                        series = df[data_column]
-                        
-                        if series.dtype == 'object':
-                            first_non_null = series.dropna().iloc[0] if len(series.dropna()) > 0 else None
-                            if isinstance(first_non_null, bytes):
-                                series = decode_binary_column(series)
-                            else:
-                                series = pd.to_numeric(series, errors='coerce')
-                        
-                        series = series.dropna()
-                        series.name = 'target'
-                        return series
+def _data_columns(instrument_folder, data_type_folder):
+    timestamp_column = find_timestamp_column(catalog.columns(instrument_folder, data_type_folder))
+    return [column for column in catalog.columns(instrument_folder, data_type_folder) if column != timestamp_column]
+
+def _read_column_series(file_path, data_column, start_ts=None, end_ts=None):
+    schema = pq.read_schema(file_path)
+    if data_column not in schema.names:
+        return None
+
+    timestamp_column = find_timestamp_column(schema.names)
+    columns = [data_column]
+    filters = None
+    if timestamp_column and timestamp_column != data_column:
+        columns.insert(0, timestamp_column)
+        if pa.types.is_integer(schema.field(timestamp_column).type):
+            filters = []
+            if start_ts is not None:
+                filters.append((timestamp_column, '>=', start_ts))
+            if end_ts is not None:
+                filters.append((timestamp_column, '<', end_ts))
+
+    with stage("parquet_read") as timing:
+        table = pq.read_table(file_path, columns=columns, filters=filters or None)
+        timing.record(table.num_rows, table.nbytes)
+
+    with stage("decode") as timing:
+        if _is_binary_type(table.schema.field(data_column).type):
+            index = pd.Index(table.column(timestamp_column).to_numpy(), name=timestamp_column) if len(columns) > 1 else None
+            values = decode_binary_array(table.column(data_column), fixed_point_precision(schema, data_column))
+            series = pd.Series(values, index=index, name=data_column)
+        else:
+            df = table.to_pandas()
+            if len(columns) > 1:
+                df = df.set_index(timestamp_column)
+            series = df[data_column]
+
+        if not filters and (start_ts is not None or end_ts is not None):
+            if start_ts is not None:
+                series = series[series.index >= start_ts]
+            if end_ts is not None:
+                series = series[series.index < end_ts]
+
+        if series.dtype == 'object':
+            first_non_null = series.dropna().iloc[0] if len(series.dropna()) > 0 else None
+            if isinstance(first_non_null, bytes):
+                series = decode_binary_column(series)
+            else:
+                series = pd.to_numeric(series, errors='coerce')
+
+        series = series.dropna()
+        timing.record(len(series))
+    return series
+
+def _slice_window(series, start_ts=None, end_ts=None):
+    if series is None or (start_ts is None and end_ts is None):
+        return series
+
+    index = series.index
+    if index.is_monotonic_increasing and pd.api.types.is_integer_dtype(index.dtype):
+        lower = index.searchsorted(start_ts, side='left') if start_ts is not None else 0
+        upper = index.searchsorted(end_ts, side='left') if end_ts is not None else len(series)
+        return series.iloc[lower:upper]
+
+    keep = np.ones(len(series), dtype=bool)
+    if start_ts is not None:
+        keep &= index >= start_ts
+    if end_ts is not None:
+        keep &= index < end_ts
+    return series[keep]
+
+def _window_share(entry, start_ts=None, end_ts=None):
+    # Share of the file's timestamp span that falls inside the window.
+    if entry.get('min_timestamp') is None or entry['max_timestamp'] <= entry['min_timestamp']:
+        return 1.0
+    lower = entry['min_timestamp'] if start_ts is None else max(start_ts, entry['min_timestamp'])
+    upper = entry['max_timestamp'] if end_ts is None else min(end_ts, entry['max_timestamp'])
+    return max(upper - lower, 0) / (entry['max_timestamp'] - entry['min_timestamp'])
+
+def _cache_whole_file(num_rows, window_share):
+    if num_rows is None:
+        return False
+    nbytes = num_rows * CACHED_ROW_BYTES
+    return nbytes <= series_cache.max_bytes * WHOLE_FILE_CACHE_SHARE or (
+        nbytes <= series_cache.max_bytes and window_share >= WHOLE_FILE_WINDOW_SHARE)
+
+def load_column_series(file_path, data_column, start_ts=None, end_ts=None, num_rows: int = None, window_share: float = 1.0):
+    # A small column, or one the window mostly covers, is cached once for the
+    # whole file and every window is sliced from it; otherwise the window is
+    # pushed into the read so only its row groups are decoded.
+    if _cache_whole_file(num_rows, window_share):
+        series = series_cache.get_or_load(
+            file_path,
+            (data_column, None, None),
+            lambda: _read_column_series(file_path, data_column)
+        )
+        return _slice_window(series, start_ts, end_ts)
+
+    return series_cache.get_or_load(
+        file_path,
+        (data_column, start_ts, end_ts),
+        lambda: _read_column_series(file_path, data_column, start_ts, end_ts)
+    )
+
+def get_series_cache_stats():
+    return series_cache.stats()
+
+def files_in_window(files, start_ts=None, end_ts=None):
+    for entry in files:
+        if entry['min_timestamp'] is not None:
+            if end_ts is not None and entry['min_timestamp'] >= end_ts:
+                continue
+            if start_ts is not None and entry['max_timestamp'] < start_ts:
+                continue
+        yield entry
+
+def load_datatype_series(instrument_folder: str, data_type_folder: str, data_column: str, start_ts: int = None, end_ts: int = None):
+    with stage("load") as timing:
+        series = _load_datatype_series(instrument_folder, data_type_folder, data_column, start_ts, end_ts)
+        if series is not None:
+            timing.record(len(series))
+        return series
+
+def _load_datatype_series(instrument_folder: str, data_type_folder: str, data_column: str, start_ts: int = None, end_ts: int = None):
+    if data_column not in catalog.columns(instrument_folder, data_type_folder):
+        return None
+
+    parts = []
+    for entry in files_in_window(catalog.files(instrument_folder, data_type_folder), start_ts, end_ts):
+        file_start_ts, file_end_ts = start_ts, end_ts
+        if entry['min_timestamp'] is not None:
+            if start_ts is not None and entry['min_timestamp'] >= start_ts:
+                file_start_ts = None
+            if end_ts is not None and entry['max_timestamp'] < end_ts:
+                file_end_ts = None
+
+        series = load_column_series(catalog.file_path(entry), data_column, file_start_ts, file_end_ts, entry.get('num_rows'),
+                                    _window_share(entry, file_start_ts, file_end_ts))
+        if series is not None and len(series) > 0:
+            parts.append(series)
+
+    if not parts:
+        return pd.Series(dtype=float)
+    if len(parts) == 1:
+        return parts[0]
+
+    series = pd.concat(parts)
+    if not series.index.is_monotonic_increasing:
+        series = series.sort_index(kind='stable')
+    return series
+
+def get_target_data_by_instrument(instrument: str, data_type: str, data_column: str, start_ts: int = None, end_ts: int = None):
+    for instrument_folder in catalog.match_instruments(instrument):
+        for data_type_folder in catalog.match_datatypes(instrument_folder, data_type):
+            series = load_datatype_series(instrument_folder, data_type_folder, data_column, start_ts, end_ts)
+            if series is not None:
+                return series.rename('target')
 
     return None
 
 
+def find_series_selection(instruments: list[str], data_types: list[str], data_columns: list[str]):
+    selection = []
+
+    with stage("catalog"):
+        for instrument in instruments:
+            for data_type in data_types:
+                for instrument_folder in catalog.match_instruments(instrument):
+                    for data_type_folder in catalog.match_datatypes(instrument_folder, data_type):
+                        for data_column in _data_columns(instrument_folder, data_type_folder):
+                            if data_column in data_columns:
+                                selection.append((instrument_folder, data_type_folder, data_column))
+
+    return selection
+
+
 def get_comparison_data_by_instrument(
     comparison_instruments: list[str],
     comparison_datatypes: list[str],
     comparison_data_columns: list[str],
+    start_ts: int = None,
+    end_ts: int = None,
 ):
-    data_folder = "data"
     results = []
 
-    for instrument in comparison_instruments:
-        for data_type in comparison_datatypes:
-            instrument = instrument.lower()
-            data_type = data_type.lower()
-
-            for foldername in os.listdir(data_folder):
-                if instrument not in foldername.lower():
-                    continue
-
-                folder_path = os.path.join(data_folder, foldername)
-                for subfolder in os.listdir(folder_path):
-                    if data_type not in subfolder.lower():
-                        continue
-
-                    exact_folder_path = os.path.join(folder_path, subfolder)
-                    filename = os.listdir(exact_folder_path)[0]
-                    df = pd.read_parquet(os.path.join(exact_folder_path, filename))
-                    
-                    if 'ts_event' in df.columns:
-                        df = df.set_index('ts_event')
-                    elif 'ts_init' in df.columns:
-                        df = df.set_index('ts_init')
-                    elif 'timestamp' in df.columns:
-                        df = df.set_index('timestamp')
-                    
-                    for data_column in df.columns:
-                        if data_column in comparison_data_columns:
-                            series = df[data_column]
-                            
-                            if series.dtype == 'object':
-                                first_non_null = series.dropna().iloc[0] if len(series.dropna()) > 0 else None
-                                if isinstance(first_non_null, bytes):
-                                    series = decode_binary_column(series)
-                                else:
-                                    series = pd.to_numeric(series, errors='coerce')
-                            
-                            series = series.dropna()
-                            series.name = 'comparison'
-                            results.append(series)
+    for instrument_folder, data_type_folder, data_column in find_series_selection(comparison_instruments, comparison_datatypes, comparison_data_columns):
+        series = load_datatype_series(instrument_folder, data_type_folder, data_column, start_ts, end_ts)
+        if series is not None:
+            results.append(series.rename('comparison'))
 
     return results
 
 
-def get_timestamp_range_for_datatype(instrument: str, data_type: str):
-    instrument = instrument.lower()
-    data_type = data_type.lower()
+def _current_file_version(entry):
+    try:
+        return file_version(catalog.file_path(entry))
+    except OSError:
+        return None, None
+
+def get_data_version(instruments: list[str], data_types: list[str], start_ts: int = None, end_ts: int = None):
+    # (path, mtime_ns, size) of every file a request over these instruments and
+    # datatypes would read, stat'ed now rather than taken from the catalog,
+    # which only refreshes every few seconds; any rewrite changes the version.
+    version = set()
+    for instrument in instruments:
+        for data_type in data_types:
+            for instrument_folder in catalog.match_instruments(instrument):
+                for data_type_folder in catalog.match_datatypes(instrument_folder, data_type):
+                    for entry in files_in_window(catalog.files(instrument_folder, data_type_folder), start_ts, end_ts):
+                        version.add((entry['path'], *_current_file_version(entry)))
 
-    for foldername in os.listdir(data_folder):
-        if instrument not in foldername.lower():
-            continue
+    return sorted(version)
 
-        folder_path = os.path.join(data_folder, foldername)
-        for subfolder in os.listdir(folder_path):
-            if data_type not in subfolder.lower():
-                continue
 
-            exact_folder_path = os.path.join(folder_path, subfolder)
-            filename = os.listdir(exact_folder_path)[0]
-            df = pd.read_parquet(os.path.join(exact_folder_path, filename))
-            
-            timestamp_col = None
-            if 'ts_event' in df.columns:
-                timestamp_col = 'ts_event'
-            elif 'ts_init' in df.columns:
-                timestamp_col = 'ts_init'
-            elif 'timestamp' in df.columns:
-                timestamp_col = 'timestamp'
-            
-            if timestamp_col:
-                return {
-                    'min_timestamp': int(df[timestamp_col].min()),
-                    'max_timestamp': int(df[timestamp_col].max())
-                }
+def get_timestamp_range_for_datatype(instrument: str, data_type: str):
+    for instrument_folder in catalog.match_instruments(instrument):
+        for data_type_folder in catalog.match_datatypes(instrument_folder, data_type):
+            timestamp_range = catalog.timestamp_range(instrument_folder, data_type_folder)
+            if timestamp_range:
+                return timestamp_range
     
     return None
 
@@ -215,19 +367,26 @@ def detect_timeframe(series):
     if series is None or len(series) < 2:
         return None
     
-    timestamps = sorted(series.index.tolist())
-    diffs = []
-    for i in range(min(100, len(timestamps) - 1)):
-        diffs.append(timestamps[i + 1] - timestamps[i])
-    
-    if not diffs:
+    timestamps = series.index.to_numpy()
+    if not series.index.is_monotonic_increasing:
+        timestamps = np.sort(timestamps)
+
+    diffs = np.diff(timestamps)
+    diffs = diffs[diffs > 0]
+    if len(diffs) == 0:
         return None
     
-    median_diff = pd.Series(diffs).median()
-    return int(median_diff)
+    return int(np.median(diffs))
 
 
 def align_series_with_offset(target_series, comparison_series, offset=0):
+    with stage("align") as timing:
+        target_aligned, comparison_aligned = _align_series_with_offset(target_series, comparison_series, offset)
+        if target_aligned is not None:
+            timing.record(len(target_aligned))
+        return target_aligned, comparison_aligned
+
+def _align_series_with_offset(target_series, comparison_series, offset=0):
     if target_series is None or comparison_series is None:
         return None, None
     
@@ -245,48 +404,36 @@ def align_series_with_offset(target_series, comparison_series, offset=0):
         final_index = target_aligned.index.intersection(comparison_aligned.index)
         return target_aligned.loc[final_index], comparison_aligned.loc[final_index]
     
-    target_timestamps = sorted(target_series.index.tolist())
-    comparison_timestamps = sorted(comparison_series.index.tolist())
-    
-    target_dict = target_series.to_dict()
-    comparison_dict = comparison_series.to_dict()
-    
-    aligned_target_data = []
-    aligned_comparison_data = []
-    aligned_indices = []
-    
-    import bisect
-    
-    for target_ts in target_timestamps:
-        target_val = target_dict.get(target_ts)
-        if target_val is None or pd.isna(target_val):
-            continue
-        
-        if offset > 0:
-            pos = bisect.bisect_right(comparison_timestamps, target_ts)
-            if pos + offset - 1 < len(comparison_timestamps):
-                comp_ts = comparison_timestamps[pos + offset - 1]
-            else:
-                continue
-        else:
-            pos = bisect.bisect_left(comparison_timestamps, target_ts)
-            if pos + offset >= 0:
-                comp_ts = comparison_timestamps[pos + offset]
-            else:
-                continue
-        
-        comp_val = comparison_dict.get(comp_ts)
-        if comp_val is None or pd.isna(comp_val):
-            continue
-        
-        aligned_target_data.append(target_val)
-        aligned_comparison_data.append(comp_val)
-        aligned_indices.append(target_ts)
-    
-    if not aligned_target_data:
+    target_timestamps, target_values = sorted_timestamps_and_values(target_series)
+    comparison_timestamps, comparison_values = sorted_timestamps_and_values(comparison_series)
+
+    if offset > 0:
+        positions = np.searchsorted(comparison_timestamps, target_timestamps, side='right') + offset - 1
+        in_range = positions < len(comparison_timestamps)
+    else:
+        positions = np.searchsorted(comparison_timestamps, target_timestamps, side='left') + offset
+        in_range = positions >= 0
+
+    aligned_indices = target_timestamps[in_range]
+    aligned_target_data = target_values[in_range]
+    aligned_comparison_data = comparison_values[positions[in_range]]
+
+    valid = pd.notna(aligned_target_data) & pd.notna(aligned_comparison_data)
+    if not valid.any():
         return pd.Series(dtype=float), pd.Series(dtype=float)
-    
-    target_aligned = pd.Series(data=aligned_target_data, index=aligned_indices, name='target')
-    comparison_aligned = pd.Series(data=aligned_comparison_data, index=aligned_indices, name='comparison')
-    
+
+    target_aligned = pd.Series(data=aligned_target_data[valid], index=aligned_indices[valid], name='target')
+    comparison_aligned = pd.Series(data=aligned_comparison_data[valid], index=aligned_indices[valid], name='comparison')
+
     return target_aligned, comparison_aligned
+
+
+def sorted_timestamps_and_values(series):
+    if series.index.is_monotonic_increasing and series.index.is_unique:
+        return series.index.to_numpy(), series.to_numpy()
+
+    # Duplicate timestamps keep their position in the sorted timeline but all
+    # resolve to the last value recorded for that timestamp.
+    timestamps = np.sort(series.index.to_numpy(), kind='stable')
+    last_values = series[~series.index.duplicated(keep='last')]
+    return timestamps, last_values.reindex(timestamps).to_numpy()
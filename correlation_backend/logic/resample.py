@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from correlation_backend.logic.read_data import detect_timeframe, sorted_timestamps_and_values
+
+
+def _ohlc4(values, starts, ends):
+    return (values[starts] + np.maximum.reduceat(values, starts) + np.minimum.reduceat(values, starts) + values[ends - 1]) / 4
+
+
+AGGREGATIONS = {
+    "last": lambda values, starts, ends: values[ends - 1],
+    "first": lambda values, starts, ends: values[starts],
+    "mean": lambda values, starts, ends: np.add.reduceat(values, starts) / (ends - starts),
+    "max": lambda values, starts, ends: np.maximum.reduceat(values, starts),
+    "min": lambda values, starts, ends: np.minimum.reduceat(values, starts),
+    "sum": lambda values, starts, ends: np.add.reduceat(values, starts),
+    "ohlc4": _ohlc4,
+}
+
+TRANSFORMS = ("levels", "returns", "log_returns")
+
+
+def parse_bar_size(resample: str):
+    if resample is None or resample == "auto":
+        return None
+    try:
+        bar_size = pd.Timedelta(resample).value
+    except ValueError:
+        bar_size = 0
+    if bar_size <= 0:
+        raise ValueError(f"Invalid resample bar size: {resample}")
+    return bar_size
+
+
+def common_bar_size(series_list):
+    # The coarsest timeframe wins: finer series can be aggregated up to it,
+    # coarser ones can't be split down.
+    timeframes = [detect_timeframe(series) for series in series_list]
+    timeframes = [timeframe for timeframe in timeframes if timeframe]
+    return max(timeframes) if timeframes else None
+
+
+def resample_series(series, bar_size: int, aggregation: str = "last"):
+    if series is None or len(series) == 0:
+        return series
+
+    timestamps, values = sorted_timestamps_and_values(series)
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    if not valid.all():
+        timestamps, values = timestamps[valid], values[valid]
+    if len(values) == 0:
+        return pd.Series(dtype=float, name=series.name)
+
+    # Bars are labelled by their start; sorted input makes every bar a
+    # contiguous run, so each aggregation is a single reduceat over the runs.
+    bars = timestamps - timestamps % bar_size
+    starts = np.flatnonzero(np.append(True, bars[1:] != bars[:-1]))
+    ends = np.append(starts[1:], len(values))
+    return pd.Series(AGGREGATIONS[aggregation](values, starts, ends), index=bars[starts], name=series.name)
+
+
+def transform_series(series, transform: str = "levels"):
+    if series is None or transform == "levels":
+        return series
+    if len(series) < 2:
+        return pd.Series(dtype=float, name=series.name)
+
+    values = series.to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if transform == "returns":
+            changes = values[1:] / values[:-1] - 1
+        else:
+            changes = np.diff(np.log(values))
+
+    finite = np.isfinite(changes)
+    return pd.Series(changes[finite], index=series.index[1:][finite], name=series.name)
+
+
+def prepare_series_list(series_list, resample: str = None, aggregation: str = "last", transform: str = "levels"):
+    if resample is not None:
+        bar_size = parse_bar_size(resample) or common_bar_size(series_list)
+        if bar_size is not None:
+            series_list = [resample_series(series, bar_size, aggregation) for series in series_list]
+
+    return [transform_series(series, transform) for series in series_list]
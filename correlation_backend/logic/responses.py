@@ -0,0 +1,81 @@
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi.responses import Response
+from correlation_backend.logic.instrumentation import stage
+from correlation_backend.logic.json_utils import finite_timeseries_arrays, series_to_columns, series_to_timeseries_array
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _json_default(obj):
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+
+
+def _map_series(value, convert, path=""):
+    if isinstance(value, pd.Series):
+        return convert(value, path)
+    if isinstance(value, dict):
+        return {key: _map_series(item, convert, f"{path}/{key}" if path else str(key)) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_map_series(item, convert, f"{path}/{index}") for index, item in enumerate(value)]
+    return value
+
+
+def encode_arrow(payload) -> bytes:
+    paths, timestamps, values = [], [], []
+
+    def collect(series, path):
+        series_timestamps, series_values = finite_timeseries_arrays(series)
+        paths.append(path)
+        timestamps.append(series_timestamps)
+        values.append(series_values)
+        return {"series": path, "length": len(series_timestamps)}
+
+    # Every series becomes a run of rows in one long (series, timestamp, value)
+    # table; everything else travels as JSON in the schema metadata with each
+    # series replaced by a reference to its dictionary key.
+    metadata = _map_series(payload, collect)
+    indices = np.repeat(np.arange(len(paths), dtype=np.int32), [len(t) for t in timestamps])
+    table = pa.table({
+        "series": pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(paths, pa.string())),
+        "timestamp": pa.array(np.concatenate(timestamps) if timestamps else np.array([], dtype=np.int64), pa.int64()),
+        "value": pa.array(np.concatenate(values) if values else np.array([], dtype=float), pa.float64()),
+    }).replace_schema_metadata({"payload": dumps_json(metadata)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def render_response(payload, response_format: str = "points", accept: str = None):
+    with stage("serialize") as timing:
+        if accept and ARROW_STREAM_MEDIA_TYPE in accept:
+            body, media_type = encode_arrow(payload), ARROW_STREAM_MEDIA_TYPE
+        elif response_format == "columnar":
+            body, media_type = dumps_json(_map_series(payload, lambda series, path: series_to_columns(series))), "application/json"
+        else:
+            body, media_type = dumps_json(_map_series(payload, lambda series, path: series_to_timeseries_array(series))), "application/json"
+        timing.record(nbytes=len(body))
+    return Response(content=body, media_type=media_type)
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+from correlation_backend.logic.series_cache import series_nbytes
+
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("CORRELATION_RESULT_CACHE_BYTES", 256 * 1024 * 1024))
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get("CORRELATION_RESULT_CACHE_TTL_SECONDS", 900))
+RESULT_CACHE_DIR = os.environ.get("CORRELATION_RESULT_CACHE_DIR")
+RESULT_CACHE_DISK_MAX_BYTES = int(os.environ.get("CORRELATION_RESULT_CACHE_DISK_BYTES", 1024 * 1024 * 1024))
+
+
+def request_fingerprint(payload: dict, data_version) -> str:
+    canonical = json.dumps({"request": payload, "data": data_version}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def payload_nbytes(value) -> int:
+    if isinstance(value, pd.Series):
+        return series_nbytes(value)
+    if isinstance(value, dict):
+        return sum(payload_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return 64 + sum(payload_nbytes(item) for item in value)
+    return 32
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES, ttl: float = RESULT_CACHE_TTL_SECONDS, directory: str = RESULT_CACHE_DIR,
+                 disk_max_bytes: int = RESULT_CACHE_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._sweep_disk()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, payload, _ = entry
+                if time.time() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return payload, "HIT"
+                self._remove(key)
+
+        stored = self._read_disk(key)
+        if stored is not None:
+            stored_at, payload = stored
+            with self._lock:
+                self.disk_hits += 1
+            # The file's mtime is when the result was computed, so promoting it
+            # to memory does not restart its TTL.
+            self._put_memory(key, payload, stored_at)
+            return payload, "HIT-DISK"
+
+        with self._lock:
+            self.misses += 1
+        return None, "MISS"
+
+    def put(self, key: str, payload):
+        stored_at = time.time()
+        self._put_memory(key, payload, stored_at)
+        self._write_disk(key, payload)
+
+    def _put_memory(self, key, payload, stored_at):
+        nbytes = payload_nbytes(payload)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (stored_at, payload, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, nbytes = self._entries.pop(key)
+        self.current_bytes -= nbytes
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if time.time() - stored_at > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                return stored_at, pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_disk(self, key, payload):
+        if not self.directory:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        self._sweep_disk()
+
+    def _sweep_disk(self):
+        # Drops expired files, then the oldest ones until the directory fits
+        # its byte budget. A payload over the budget on its own is not kept.
+        with self._disk_lock:
+            files = []
+            try:
+                with os.scandir(self.directory) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".pkl"):
+                            stat = entry.stat()
+                            files.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError:
+                return
+
+            now = time.time()
+            total = sum(size for _, size, _ in files)
+            for mtime, size, path in sorted(files):
+                if now - mtime <= self.ttl and total <= self.disk_max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.disk_evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "disk_directory": self.directory,
+                "disk_max_bytes": self.disk_max_bytes,
+                "disk_evictions": self.disk_evictions,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else None,
+            }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,124 @@
+import os
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+ROLLING_METHODS = ("pearson", "spearman", "kendalltau", "linregress")
+APPROXIMATE_ROLLING_METHODS = ("kendalltau",)
+RANK_BLOCK_WINDOWS = int(os.environ.get("CORRELATION_ROLLING_RANK_BLOCK", 64))
+
+
+def _window_sums(values, window):
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    return cumulative[window:] - cumulative[:-window]
+
+
+def _rolling_moments(x, y, window):
+    # Centring first keeps the running sums small so the differences of
+    # cumulative sums do not lose precision on long, trending series.
+    x = x - x.mean()
+    y = y - y.mean()
+    sum_x = _window_sums(x, window)
+    sum_y = _window_sums(y, window)
+    sum_xx = _window_sums(x * x, window)
+    sum_yy = _window_sums(y * y, window)
+    var_x = sum_xx - sum_x ** 2 / window
+    var_y = sum_yy - sum_y ** 2 / window
+    cov = _window_sums(x * y, window) - sum_x * sum_y / window
+    # Cumulative-sum round-off leaves a flat window with a tiny variance
+    # instead of zero
+    flat_x = var_x <= 1e-9 * sum_xx
+    flat_y = var_y <= 1e-9 * sum_yy
+    return var_x, var_y, cov, flat_x, flat_y
+
+
+def rolling_pearson(x, y, window):
+    var_x, var_y, cov, flat_x, flat_y = _rolling_moments(x, y, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = cov / np.sqrt(var_x * var_y)
+    r[flat_x | flat_y] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def rolling_beta(x, y, window):
+    var_x, _, cov, flat_x, _ = _rolling_moments(x, y, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = cov / var_x
+    beta[flat_x] = np.nan
+    return beta
+
+
+def _tie_weights(values, edge):
+    # Row c holds, for every value, 2 if edge[c] is below it and 1 if equal:
+    # summed over a window this is twice the value's average rank, minus 1.
+    return (values[None, :] > edge[:, None]).astype(np.int16) + (values[None, :] >= edge[:, None])
+
+
+def _rolling_ranks(values, window, block):
+    # Yields (start, ranks) where ranks[b, k] is twice the centred average
+    # rank of values[start + b + k] inside values[start + b:start + b + window].
+    # The windows of a block share the middle of their span, which is sorted
+    # once; the values entering and leaving at the two ends are counted
+    # directly and summed cumulatively across the block.
+    for start in range(0, len(values) - window + 1, block):
+        size = min(block, len(values) - window + 1 - start)
+        span = values[start:start + size + window - 1]
+
+        core = np.sort(span[size - 1:window])
+        core_weights = np.searchsorted(core, span, side='left') + np.searchsorted(core, span, side='right')
+
+        # Window b holds left-edge values b..size-2 and right-edge values
+        # window..window+b-1.
+        edge_weights = np.zeros((size, len(span)), dtype=np.int32)
+        if size > 1:
+            edge_weights[:-1] = np.cumsum(_tie_weights(span, span[size - 2::-1]), axis=0)[::-1]
+            edge_weights[1:] += np.cumsum(_tie_weights(span, span[window:]), axis=0)
+
+        # Window b starts at span[b], i.e. at flat position b * (len(span) + 1)
+        # of edge_weights.
+        band = sliding_window_view(edge_weights.ravel(), window)[::len(span) + 1]
+        yield start, sliding_window_view(core_weights, window)[:size] + band - window
+
+
+def rolling_spearman(x, y, window, block: int = RANK_BLOCK_WINDOWS):
+    # Exact: every window is ranked on its own, average ranks for ties, as
+    # spearmanr does. The cost is O(n * window), not O(n).
+    block = max(1, min(block, window))
+    rho = np.empty(len(x) - window + 1)
+    for (start, x_ranks), (_, y_ranks) in zip(_rolling_ranks(x, window, block), _rolling_ranks(y, window, block)):
+        x_ranks = x_ranks.astype(float)
+        y_ranks = y_ranks.astype(float)
+        var_x = np.einsum('ij,ij->i', x_ranks, x_ranks)
+        var_y = np.einsum('ij,ij->i', y_ranks, y_ranks)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rho[start:start + len(x_ranks)] = np.einsum('ij,ij->i', x_ranks, y_ranks) / np.sqrt(var_x * var_y)
+    return np.clip(rho, -1.0, 1.0)
+
+
+def rolling_kendalltau(x, y, window):
+    # Greiner's estimate tau = 2/pi * arcsin(r) from the rolling Pearson r,
+    # O(n) for any window; exact tau per window would cost
+    # O(n * window log window). Against per-window kendalltau at window 100
+    # it is off by about 0.015 on average (0.08 at most) for jointly Gaussian
+    # data, and by about 0.045 (0.3 at most) on random-walk price levels.
+    return 2 / np.pi * np.arcsin(rolling_pearson(x, y, window))
+
+
+ROLLING_FUNCTIONS = {
+    "pearson": rolling_pearson,
+    "spearman": rolling_spearman,
+    "kendalltau": rolling_kendalltau,
+    "linregress": rolling_beta,
+}
+
+
+def rolling_analysis(target_aligned, comparison_aligned, window, methods):
+    x = target_aligned.to_numpy(dtype=float)
+    y = comparison_aligned.to_numpy(dtype=float)
+    methods = [method for method in ROLLING_METHODS if method in methods]
+
+    if len(x) < window:
+        return {method: pd.Series(dtype=float) for method in methods}
+
+    index = target_aligned.index[window - 1:]
+    return {method: pd.Series(ROLLING_FUNCTIONS[method](x, y, window), index=index) for method in methods}
@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = int(os.environ.get("CORRELATION_SERIES_CACHE_BYTES", 512 * 1024 * 1024))
+
+
+def file_version(file_path: str):
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def series_nbytes(series) -> int:
+    return int(series.memory_usage(index=True, deep=False))
+
+
+class SeriesCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, file_path: str, column, loader):
+        key = (os.path.abspath(file_path), column)
+        version = file_version(file_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._remove(key)
+                self.invalidations += 1
+            self.misses += 1
+
+        series = loader()
+        if series is not None:
+            self._put(key, version, series)
+        return series
+
+    def _put(self, key, version, series):
+        nbytes = series_nbytes(series)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, series, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, nbytes = self._entries.pop(key)
+        self.current_bytes -= nbytes
+
+    def invalidate(self, file_path: str = None):
+        with self._lock:
+            if file_path is None:
+                keys = list(self._entries)
+            else:
+                abs_path = os.path.abspath(file_path)
+                keys = [key for key in self._entries if key[0] == abs_path]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+series_cache = SeriesCache()
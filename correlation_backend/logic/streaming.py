@@ -0,0 +1,258 @@
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from correlation_backend.logic.calc_analysis import EMPTY_RESULTS, correlation_analysis, linregress_from_moments, pearson_from_moments, rank_confidence_interval
+from correlation_backend.logic.json_utils import convert_analysis_result
+from correlation_backend.logic.parquet_utils import find_timestamp_column, row_group_timestamp_bounds
+from correlation_backend.logic.read_data import catalog, column_values, files_in_window
+
+STREAM_BATCH_ROWS = int(os.environ.get("CORRELATION_STREAM_BATCH_ROWS", 250_000))
+STREAM_RANK_SAMPLE_SIZE = int(os.environ.get("CORRELATION_STREAM_RANK_SAMPLE_SIZE", 200_000))
+
+RANK_METHODS = ("spearman", "kendalltau")
+
+
+def _row_groups_in_window(parquet_file, timestamp_column, start_ts=None, end_ts=None):
+    row_groups = []
+    for row_group_index, bounds in enumerate(row_group_timestamp_bounds(parquet_file, timestamp_column)):
+        if bounds is not None:
+            if end_ts is not None and bounds[0] >= end_ts:
+                continue
+            if start_ts is not None and bounds[1] < start_ts:
+                continue
+        row_groups.append(row_group_index)
+    return row_groups
+
+
+def iter_series_chunks(instrument_folder, data_type_folder, data_column, start_ts=None, end_ts=None, batch_rows: int = STREAM_BATCH_ROWS):
+    # Yields (timestamps, values) chunks in timestamp order, never holding
+    # more than one record batch of the datatype in memory.
+    last_timestamp = None
+    for entry in files_in_window(catalog.files(instrument_folder, data_type_folder), start_ts, end_ts):
+        parquet_file = pq.ParquetFile(catalog.file_path(entry))
+        schema = parquet_file.schema_arrow
+        timestamp_column = find_timestamp_column(schema.names)
+        if timestamp_column is None or data_column not in schema.names:
+            continue
+
+        row_groups = _row_groups_in_window(parquet_file, timestamp_column, start_ts, end_ts)
+        if not row_groups:
+            continue
+
+        for batch in parquet_file.iter_batches(batch_rows, row_groups=row_groups, columns=[timestamp_column, data_column]):
+            timestamp_array = batch.column(0)
+            if pa.types.is_timestamp(timestamp_array.type):
+                timestamp_array = timestamp_array.cast(pa.int64())
+            timestamps = timestamp_array.to_numpy(zero_copy_only=False).astype(np.int64, copy=False)
+            values = column_values(batch.column(1), schema, data_column)
+
+            keep = ~np.isnan(values)
+            if start_ts is not None:
+                keep &= timestamps >= start_ts
+            if end_ts is not None:
+                keep &= timestamps < end_ts
+            timestamps, values = timestamps[keep], values[keep]
+            if len(timestamps) == 0:
+                continue
+
+            if np.any(timestamps[1:] < timestamps[:-1]):
+                order = np.argsort(timestamps, kind='stable')
+                timestamps, values = timestamps[order], values[order]
+            if last_timestamp is not None and timestamps[0] < last_timestamp:
+                raise ValueError(f"Streaming needs files in {instrument_folder}/{data_type_folder} that do not overlap in time")
+            last_timestamp = timestamps[-1]
+
+            yield timestamps, values
+
+
+class MomentAccumulator:
+    # Chan et al. pairwise update: each chunk's centred moments are merged into
+    # the running ones, which stays accurate where raw power sums would cancel.
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.sxx = 0.0
+        self.syy = 0.0
+        self.sxy = 0.0
+
+    def update(self, x, y):
+        m = len(x)
+        if m == 0:
+            return
+
+        chunk_mean_x = x.mean()
+        chunk_mean_y = y.mean()
+        dx = x - chunk_mean_x
+        dy = y - chunk_mean_y
+        n = self.n + m
+        delta_x = chunk_mean_x - self.mean_x
+        delta_y = chunk_mean_y - self.mean_y
+        weight = self.n * m / n
+
+        self.sxx += dx @ dx + delta_x * delta_x * weight
+        self.syy += dy @ dy + delta_y * delta_y * weight
+        self.sxy += dx @ dy + delta_x * delta_y * weight
+        self.mean_x += delta_x * m / n
+        self.mean_y += delta_y * m / n
+        self.n = n
+
+
+class PairReservoir:
+    # Uniform sample of the aligned pairs (Algorithm R, vectorized per chunk).
+    def __init__(self, size: int, seed: int = 0):
+        self.size = size
+        self.seen = 0
+        self.x = np.array([], dtype=float)
+        self.y = np.array([], dtype=float)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, x, y):
+        m = len(x)
+        fill = min(max(self.size - self.seen, 0), m)
+        if fill:
+            self.x = np.concatenate([self.x, x[:fill]])
+            self.y = np.concatenate([self.y, y[:fill]])
+
+        if fill < m:
+            items = np.arange(fill, m)
+            slots = self._rng.integers(0, self.seen + items + 1)
+            accepted = slots < self.size
+            items, slots = items[accepted], slots[accepted]
+            # Where several items land in one slot only the latest survives.
+            _, last = np.unique(slots[::-1], return_index=True)
+            keep = len(slots) - 1 - last
+            self.x[slots[keep]] = x[items[keep]]
+            self.y[slots[keep]] = y[items[keep]]
+
+        self.seen += m
+
+    @property
+    def exact(self):
+        return self.seen <= self.size
+
+    def sample(self):
+        return self.x, self.y
+
+
+class ComparisonStream:
+    # Keeps only the comparison rows the current and later target chunks can
+    # still pair with, following the offset rules of align_series_with_offset.
+    def __init__(self, chunks, offset: int = 0, rank_sample_size: int = STREAM_RANK_SAMPLE_SIZE):
+        self.offset = offset
+        self.moments = MomentAccumulator()
+        self.reservoir = PairReservoir(rank_sample_size)
+        self._chunks = chunks
+        self._timestamps = np.array([], dtype=np.int64)
+        self._values = np.array([], dtype=float)
+        self._exhausted = False
+
+    def _fill(self):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._exhausted = True
+            return
+        self._timestamps = np.concatenate([self._timestamps, chunk[0]])
+        self._values = np.concatenate([self._values, chunk[1]])
+
+    def _drop_before(self, target_ts):
+        # Rows more than |offset| places before the first row at target_ts
+        # cannot pair with it or any later target row.
+        keep_from = max(int(np.searchsorted(self._timestamps, target_ts, side='left')) + min(self.offset, 0), 0)
+        self._timestamps = self._timestamps[keep_from:]
+        self._values = self._values[keep_from:]
+
+    def _ready(self, target_timestamps):
+        # Leading target rows with enough buffered rows after them to be paired
+        # the same way the whole comparison series would pair them.
+        if self._exhausted:
+            return len(target_timestamps)
+        needed_after = max(self.offset, 1)
+        if len(self._timestamps) < needed_after:
+            return 0
+        return int(np.searchsorted(target_timestamps, self._timestamps[-needed_after], side='left'))
+
+    def update(self, target_timestamps, target_values):
+        # The target batch is split at the end of the buffered comparison rows
+        # and the buffer is trimmed to the next pending target row, so neither
+        # grows past a batch plus |offset| rows.
+        while len(target_timestamps):
+            self._drop_before(target_timestamps[0])
+            ready = self._ready(target_timestamps)
+            if ready == 0:
+                self._fill()
+                continue
+            self._pair(target_timestamps[:ready], target_values[:ready])
+            target_timestamps, target_values = target_timestamps[ready:], target_values[ready:]
+
+    def _pair(self, target_timestamps, target_values):
+        timestamps = self._timestamps
+
+        if self.offset == 0:
+            positions = np.searchsorted(timestamps, target_timestamps, side='left')
+            in_range = positions < len(timestamps)
+            in_range[in_range] = timestamps[positions[in_range]] == target_timestamps[in_range]
+        elif self.offset > 0:
+            positions = np.searchsorted(timestamps, target_timestamps, side='right') + self.offset - 1
+            in_range = positions < len(timestamps)
+        else:
+            positions = np.searchsorted(timestamps, target_timestamps, side='left') + self.offset
+            in_range = positions >= 0
+
+        x = target_values[in_range]
+        y = self._values[positions[in_range]]
+        self.moments.update(x, y)
+        self.reservoir.update(x, y)
+
+    def results(self, methods, rank_engine: str = "scipy"):
+        moments = self.moments
+        rank_methods = [method for method in RANK_METHODS if method in methods]
+        if moments.n < 2:
+            results = {method: EMPTY_RESULTS[method] for method in methods}
+            if rank_methods:
+                results["rank_engine"] = {"engine": rank_engine, "sample_size": moments.n, "confidence_intervals": {}}
+            return results
+
+        results = {}
+        if "pearson" in methods:
+            results["pearson"] = convert_analysis_result(pearson_from_moments(moments.sxx, moments.syy, moments.sxy, moments.n))
+        if "linregress" in methods:
+            results["linregress"] = convert_analysis_result(linregress_from_moments(moments.mean_x, moments.mean_y, moments.sxx, moments.syy, moments.sxy, moments.n))
+
+        if rank_methods:
+            reservoir = self.reservoir
+            results.update(correlation_analysis(*reservoir.sample(), rank_methods, rank_engine, reservoir.size))
+            if not reservoir.exact:
+                # The reservoir is itself a sample of the aligned pairs
+                sample_size = len(reservoir.x)
+                for method in rank_methods:
+                    results["rank_engine"]["confidence_intervals"][method] = rank_confidence_interval(method, results[method][0], sample_size)
+
+        return {method: results[method] for method in [*methods, "rank_engine"] if method in results}
+
+
+def streaming_analysis(target_selection, comparison_selections, methods, offset: int = 0, start_ts: int = None, end_ts: int = None,
+                       batch_rows: int = STREAM_BATCH_ROWS, rank_sample_size: int = STREAM_RANK_SAMPLE_SIZE, rank_engine: str = "scipy"):
+    methods = [method for method in EMPTY_RESULTS if method in methods]
+    streams = [
+        ComparisonStream(iter_series_chunks(*selection, start_ts, end_ts, batch_rows), offset, rank_sample_size)
+        for selection in comparison_selections
+    ]
+
+    for target_timestamps, target_values in iter_series_chunks(*target_selection, start_ts, end_ts, batch_rows):
+        for stream in streams:
+            stream.update(target_timestamps, target_values)
+
+    results = {f"{method}_results": [] for method in EMPTY_RESULTS}
+    for stream in streams:
+        for method, result in stream.results(methods, rank_engine).items():
+            results.setdefault(f"{method}_results", []).append(result)
+
+    rank_methods = [method for method in RANK_METHODS if method in methods]
+    return {
+        "n_obs": [stream.moments.n for stream in streams],
+        "rank_sample_sizes": [min(stream.reservoir.seen, stream.reservoir.size) for stream in streams],
+        "approximate_methods": rank_methods if any(not stream.reservoir.exact for stream in streams) else [],
+        **results
+    }
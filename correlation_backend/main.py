@@ -1,7 +1,14 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from correlation_backend.logic.calc_analysis import pearson_analysis, spearman_analysis, kendalltau_analysis, linregress_analysis
+from typing import Literal
+from correlation_backend.logic.calc_analysis import correlation_analysis, EMPTY_RESULTS, RANK_SAMPLE_SIZE
+from correlation_backend.logic.lag_scan import lag_scan, APPROXIMATE_LAG_SCAN_METHODS, LAG_SCAN_METHODS, MAX_LAG_SPAN
+from correlation_backend.logic.rolling import rolling_analysis, APPROXIMATE_ROLLING_METHODS
+from correlation_backend.logic.downsample import downsample_series
+from correlation_backend.logic.matrix import correlation_matrix, shares_timestamps, MATRIX_METHODS
+from correlation_backend.logic.resample import prepare_series_list
+from correlation_backend.logic.streaming import streaming_analysis, STREAM_BATCH_ROWS, STREAM_RANK_SAMPLE_SIZE
 from fastapi.middleware.cors import CORSMiddleware
 from correlation_backend.logic.read_data import (
     get_target_data_by_instrument, 
@@ -10,23 +17,36 @@ from correlation_backend.logic.read_data import (
     get_available_instruments,
     get_available_datatypes,
     get_timestamp_range_for_datatype,
-    align_series_with_offset
+    align_series_with_offset,
+    get_series_cache_stats,
+    get_data_version,
+    find_series_selection,
+    load_datatype_series,
+    rescan_catalog
 )
-from correlation_backend.logic.json_utils import series_to_timeseries_array, nanoseconds_to_datetime
+from correlation_backend.logic.json_utils import nanoseconds_to_datetime
+from correlation_backend.logic.responses import render_response
+from correlation_backend.logic.executor import analysis_executor
+from correlation_backend.logic.jobs import Job, job_manager
+from correlation_backend.logic.result_cache import request_fingerprint, result_cache
+from correlation_backend.logic.instrumentation import (
+    INSTRUMENTATION_ENABLED,
+    SERVER_TIMING_ENABLED,
+    log_event,
+    render_metrics,
+    request_seconds,
+    response_bytes,
+    stage,
+    start_trace
+)
+import asyncio
+import functools
 import json
-import numpy as np
-
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        if isinstance(obj, np.floating):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        if isinstance(obj, np.bool_):
-            return bool(obj)
-        return super().default(obj)
+import logging
+import time
+import pandas as pd
+
+JOB_EVENT_INTERVAL_SECONDS = 0.5
 
 app = FastAPI()
 
@@ -38,19 +58,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def instrument_request(request: Request, call_next):
+    trace = start_trace()
+    start = time.perf_counter()
+    status = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        seconds = time.perf_counter() - start
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        request_seconds.observe(seconds, endpoint, str(status))
+        size = int(response.headers.get("content-length", 0)) if response is not None else 0
+        if size:
+            response_bytes.inc(size, endpoint)
+        if response is not None and SERVER_TIMING_ENABLED and trace.stages:
+            response.headers["Server-Timing"] = trace.server_timing()
+        log_event(
+            "request",
+            method=request.method,
+            endpoint=endpoint,
+            status=status,
+            duration_ms=round(seconds * 1000, 3),
+            response_bytes=size,
+            cache=response.headers.get("x-cache") if response is not None else None,
+            stages={name: {**totals, "seconds": round(totals["seconds"], 6)} for name, totals in trace.stages.items()}
+        )
+
+# Only registered when enabled, so a disabled build pays nothing per request
+if INSTRUMENTATION_ENABLED:
+    app.middleware("http")(instrument_request)
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/analysismethods")
 async def get_analysis_methods():
     return {"analysis_methods": ["pearson", "spearman", "kendalltau"]}
 
 @app.get("/available-instruments")
-async def get_instruments():
+def get_instruments():
     return {"instruments": get_available_instruments()}
 
+@app.get("/cache-stats")
+async def get_cache_stats():
+    return {"series_cache": get_series_cache_stats(), "result_cache": result_cache.stats()}
+
+@app.get("/executor-stats")
+async def get_executor_stats():
+    return {"executor": analysis_executor.stats()}
+
+@app.post("/catalog/rescan")
+def post_catalog_rescan():
+    return {"catalog": rescan_catalog()}
+
 class GetDatatypesRequest(BaseModel):
     instrument: str
 
 @app.post("/available-datatypes")
-async def get_datatypes(body: GetDatatypesRequest):
+def get_datatypes(body: GetDatatypesRequest):
     return {"datatypes": get_available_datatypes(body.instrument)}
 
 class GetTimestampRangeRequest(BaseModel):
@@ -58,7 +128,7 @@ class GetTimestampRangeRequest(BaseModel):
     datatype: str
 
 @app.post("/timestamp-range")
-async def get_timestamp_range(body: GetTimestampRangeRequest):
+def get_timestamp_range(body: GetTimestampRangeRequest):
     timestamp_range = get_timestamp_range_for_datatype(body.instrument, body.datatype)
     if timestamp_range:
         timestamp_range['min_datetime'] = nanoseconds_to_datetime(timestamp_range['min_timestamp'])
@@ -80,6 +150,14 @@ class FindFilePath(BaseModel):
     end_month: str
     end_year: str
     offset: int = 0
+    resample: str | None = None
+    aggregation: Literal["last", "first", "mean", "max", "min", "sum", "ohlc4"] = "last"
+    transform: Literal["levels", "returns", "log_returns"] = "levels"
+    rank_engine: Literal["scipy", "subsample"] = "scipy"
+    rank_sample_size: int = RANK_SAMPLE_SIZE
+    max_points: int | None = None
+    downsample_method: Literal["lttb", "minmax"] = "lttb"
+    response_format: Literal["points", "columnar"] = "points"
 
 
 class FindAvailableDataColumns(BaseModel):
@@ -87,68 +165,399 @@ class FindAvailableDataColumns(BaseModel):
     datatype: list[str]
 
 @app.post("/available-data-columns")
-async def find_available_data_columns(body: FindAvailableDataColumns):
+def find_available_data_columns(body: FindAvailableDataColumns):
     return {"available_data_columns": get_available_data_columns(body.instrument, body.datatype)}
 
-@app.post("/analysedData")
-async def analyze(request: FindFilePath):
-    try:
-        from datetime import datetime
-        
-        start_ts = int(datetime(int(request.start_year), int(request.start_month), 1).timestamp() * 1_000_000_000)
-        end_year = int(request.end_year)
-        end_month = int(request.end_month)
-        next_month = end_month + 1 if end_month < 12 else 1
-        next_year = end_year if end_month < 12 else end_year + 1
-        end_ts = int(datetime(next_year, next_month, 1).timestamp() * 1_000_000_000)
-
-        target_column_content = get_target_data_by_instrument(
-            request.target_instrument, 
-            request.target_datatype, 
-            request.target_data_column
-        )
-        comparison_data = get_comparison_data_by_instrument(
-            request.comparison_instruments, 
-            request.comparison_datatypes, 
-            request.comparison_data_columns
+def _month_window(request):
+    from datetime import datetime
+
+    start_ts = int(datetime(int(request.start_year), int(request.start_month), 1).timestamp() * 1_000_000_000)
+    end_year = int(request.end_year)
+    end_month = int(request.end_month)
+    next_month = end_month + 1 if end_month < 12 else 1
+    next_year = end_year if end_month < 12 else end_year + 1
+    end_ts = int(datetime(next_year, next_month, 1).timestamp() * 1_000_000_000)
+    return start_ts, end_ts
+
+def _load_request_data(request: FindFilePath):
+    start_ts, end_ts = _month_window(request)
+
+    target_column_content = get_target_data_by_instrument(
+        request.target_instrument, 
+        request.target_datatype, 
+        request.target_data_column,
+        start_ts,
+        end_ts
+    )
+    comparison_data = get_comparison_data_by_instrument(
+        request.comparison_instruments, 
+        request.comparison_datatypes, 
+        request.comparison_data_columns,
+        start_ts,
+        end_ts
+    )
+
+    if target_column_content is None:
+        return target_column_content, comparison_data
+
+    with stage("resample"):
+        target_column_content, *comparison_data = prepare_series_list(
+            [target_column_content, *comparison_data],
+            request.resample,
+            request.aggregation,
+            request.transform
         )
+    return target_column_content, comparison_data
+
+def _display_series(series, request):
+    if request.max_points is None:
+        return series
+    with stage("downsample") as timing:
+        timing.record(len(series))
+        return downsample_series(series, request.max_points, request.downsample_method)
+
+def _analyze_comparison(target_column_content, request: FindFilePath, content):
+    aligned_target, aligned_comparison = align_series_with_offset(target_column_content, content, request.offset)
+    
+    if aligned_target is None or aligned_comparison is None or len(aligned_target) == 0 or len(aligned_comparison) == 0:
+        return {**EMPTY_RESULTS, **correlation_analysis([], [], request.methods, request.rank_engine, request.rank_sample_size)}
+    
+    return correlation_analysis(aligned_target.to_numpy(), aligned_comparison.to_numpy(), request.methods, request.rank_engine, request.rank_sample_size)
+
+def _compute_analysis(request: FindFilePath, job: Job = None):
+    if request.rank_sample_size < 10:
+        return {"error": "rank_sample_size must be at least 10"}
+
+    if job is not None:
+        job.set_stage("loading")
+
+    target_column_content, comparison_data = _load_request_data(request)
+    
+    if target_column_content is None or len(comparison_data) == 0:
+        return {"error": "No data found for the selected instruments/columns"}
+
+    if job is not None:
+        job.set_stage("analyzing", len(comparison_data))
+
+    def analyze_comparison(content):
+        if job is not None:
+            job.check_cancelled()
+        analysis = _analyze_comparison(target_column_content, request, content)
+        if job is not None:
+            job.advance()
+        return analysis
+
+    results = {"pearson_results": [], "spearman_results": [], "kendalltau_results": [], "linregress_results": []}
+    
+    for analysis in analysis_executor.map(analyze_comparison, comparison_data):
+        for method, result in analysis.items():
+            results.setdefault(f"{method}_results", []).append(result)
+    
+    return {
+        "target_column_content": _display_series(target_column_content, request), 
+        "comparison_column_contents": [_display_series(s, request) for s in comparison_data],
+        **results
+    }
+
+def _result_fingerprint(request: FindFilePath):
+    start_ts, end_ts = _month_window(request)
+    data_version = get_data_version(
+        [request.target_instrument, *request.comparison_instruments],
+        [request.target_datatype, *request.comparison_datatypes],
+        start_ts,
+        end_ts
+    )
+    # response_format only changes how the cached payload is rendered
+    return request_fingerprint(request.model_dump(exclude={"response_format"}), data_version)
+
+def _cached_analysis(request: FindFilePath, job: Job = None):
+    key = _result_fingerprint(request)
+    response_data, cache_status = result_cache.get(key)
+    if response_data is None:
+        response_data = _compute_analysis(request, job)
+        if "error" not in response_data:
+            result_cache.put(key, response_data)
+    return response_data, cache_status
+
+def _analyze(request: FindFilePath, accept: str = None):
+    try:
+        response_data, cache_status = _cached_analysis(request)
+        if "error" in response_data:
+            return response_data
         
+        response = render_response(response_data, request.response_format, accept)
+        response.headers["X-Cache"] = cache_status
+        return response
+    except Exception as e:
+        log_event("analyze_failed", logging.ERROR, exc_info=True, error=str(e))
+        return {"error": str(e)}
+
+@app.post("/analysedData")
+async def analyze(request: FindFilePath, http_request: Request):
+    return await analysis_executor.run(_analyze, request, http_request.headers.get("accept"))
+
+def _analysis_job(job: Job, request: FindFilePath):
+    response_data, _ = _cached_analysis(request, job)
+    if "error" in response_data:
+        raise ValueError(response_data["error"])
+    return response_data
+
+@app.post("/jobs", status_code=202)
+def submit_job(request: FindFilePath):
+    job = job_manager.submit(_analysis_job, request, fingerprint=_result_fingerprint(request))
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"error": "Job not found"}
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"error": "Job not found"}
+
+    async def events():
+        last_state = None
+        while True:
+            state = job.to_dict()
+            if state != last_state:
+                yield f"data: {json.dumps(state)}\n\n"
+                last_state = state
+            if job.finished:
+                break
+            await asyncio.sleep(JOB_EVENT_INTERVAL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, http_request: Request, response_format: Literal["points", "columnar"] = "points"):
+    # The format is chosen when fetching: jobs are shared between identical
+    # requests whatever response_format each of them asked for.
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"error": "Job not found"}
+    if job.status != "completed":
+        return {**job.to_dict(), "error": f"Job is {job.status}"}
+
+    return await analysis_executor.run(render_response, job.result, response_format, http_request.headers.get("accept"))
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return {"error": "Job not found"}
+    return job.to_dict()
+
+class LagScanRequest(FindFilePath):
+    min_lag: int = -100
+    max_lag: int = 100
+
+def _scan_lags(request: LagScanRequest):
+    try:
+        if request.min_lag > request.max_lag:
+            return {"error": "min_lag must not be greater than max_lag"}
+        if request.max_lag - request.min_lag + 1 > MAX_LAG_SPAN:
+            return {"error": f"A lag scan covers at most {MAX_LAG_SPAN} lags"}
+
+        methods = [method for method in LAG_SCAN_METHODS if method in request.methods]
+        if not methods:
+            return {"error": f"Lag scan supports the methods: {', '.join(LAG_SCAN_METHODS)}"}
+
+        target_column_content, comparison_data = _load_request_data(request)
+
         if target_column_content is None or len(comparison_data) == 0:
             return {"error": "No data found for the selected instruments/columns"}
 
-        target_column_content = target_column_content[(target_column_content.index >= start_ts) & (target_column_content.index < end_ts)]
-        comparison_data = [s[(s.index >= start_ts) & (s.index < end_ts)] for s in comparison_data]
+        lags = list(range(request.min_lag, request.max_lag + 1))
+        response_data = {
+            "lags": lags,
+            "approximate_methods": [method for method in APPROXIMATE_LAG_SCAN_METHODS if method in methods],
+        }
+        for method in methods:
+            response_data[f"{method}_results"] = analysis_executor.map(
+                lambda content: lag_scan(target_column_content, content, lags, method),
+                comparison_data
+            )
+
+        return render_response(response_data)
+    except Exception as e:
+        log_event("scan_lags_failed", logging.ERROR, exc_info=True, error=str(e))
+        return {"error": str(e)}
+
+@app.post("/lag-scan")
+async def scan_lags(request: LagScanRequest):
+    return await analysis_executor.run(_scan_lags, request)
+
+class RollingAnalysisRequest(FindFilePath):
+    window: int = 100
+
+def _rolling_comparison(target_column_content, request: RollingAnalysisRequest, content):
+    aligned_target, aligned_comparison = align_series_with_offset(target_column_content, content, request.offset)
+
+    if aligned_target is None or aligned_comparison is None or len(aligned_target) == 0 or len(aligned_comparison) == 0:
+        return {method: pd.Series(dtype=float) for method in ("pearson", "spearman", "kendalltau", "linregress")}
+
+    rolling = rolling_analysis(aligned_target, aligned_comparison, request.window, request.methods)
+    return {method: _display_series(series, request) for method, series in rolling.items()}
+
+def _analyze_rolling(request: RollingAnalysisRequest, accept: str = None):
+    try:
+        if request.window < 2:
+            return {"error": "window must be at least 2"}
+
+        target_column_content, comparison_data = _load_request_data(request)
+
+        if target_column_content is None or len(comparison_data) == 0:
+            return {"error": "No data found for the selected instruments/columns"}
 
         results = {"pearson_results": [], "spearman_results": [], "kendalltau_results": [], "linregress_results": []}
-        
-        for content in comparison_data:
-            aligned_target, aligned_comparison = align_series_with_offset(target_column_content, content, request.offset)
-            
-            if aligned_target is None or aligned_comparison is None or len(aligned_target) == 0 or len(aligned_comparison) == 0:
-                results["pearson_results"].append((None, None))
-                results["spearman_results"].append((None, None))
-                results["kendalltau_results"].append((None, None))
-                results["linregress_results"].append((None, None, None, None, None))
-                continue
-            
-            if "pearson" in request.methods:
-                results["pearson_results"].append(pearson_analysis(aligned_target, aligned_comparison))
-            if "spearman" in request.methods:
-                results["spearman_results"].append(spearman_analysis(aligned_target, aligned_comparison))
-            if "kendalltau" in request.methods:
-                results["kendalltau_results"].append(kendalltau_analysis(aligned_target, aligned_comparison))
-            if "linregress" in request.methods:
-                results["linregress_results"].append(linregress_analysis(aligned_target, aligned_comparison))
-        
+
+        rolling_results = analysis_executor.map(functools.partial(_rolling_comparison, target_column_content, request), comparison_data)
+        for rolling in rolling_results:
+            for method, series in rolling.items():
+                results[f"{method}_results"].append(series)
+
         response_data = {
-            "target_column_content": series_to_timeseries_array(target_column_content), 
-            "comparison_column_contents": [series_to_timeseries_array(s) for s in comparison_data],
+            "window": request.window,
+            "approximate_methods": [method for method in APPROXIMATE_ROLLING_METHODS if method in request.methods],
             **results
         }
-        
-        return JSONResponse(content=json.loads(json.dumps(response_data, cls=NumpyEncoder)))
+
+        return render_response(response_data, request.response_format, accept)
+    except Exception as e:
+        log_event("analyze_rolling_failed", logging.ERROR, exc_info=True, error=str(e))
+        return {"error": str(e)}
+
+@app.post("/rolling-analysis")
+async def analyze_rolling(request: RollingAnalysisRequest, http_request: Request):
+    return await analysis_executor.run(_analyze_rolling, request, http_request.headers.get("accept"))
+
+class StreamingAnalysisRequest(FindFilePath):
+    batch_rows: int = STREAM_BATCH_ROWS
+    rank_sample_size: int = STREAM_RANK_SAMPLE_SIZE
+
+def _analyze_streaming(request: StreamingAnalysisRequest):
+    try:
+        if request.resample is not None or request.transform != "levels":
+            return {"error": "Streaming analysis does not support resample or transform"}
+        if request.batch_rows < 1:
+            return {"error": "batch_rows must be positive"}
+        if request.rank_sample_size < 10:
+            return {"error": "rank_sample_size must be at least 10"}
+
+        start_ts, end_ts = _month_window(request)
+        target_selection = find_series_selection([request.target_instrument], [request.target_datatype], [request.target_data_column])
+        comparison_selections = find_series_selection(request.comparison_instruments, request.comparison_datatypes, request.comparison_data_columns)
+
+        if not target_selection or not comparison_selections:
+            return {"error": "No data found for the selected instruments/columns"}
+
+        comparisons = [f"{instrument_folder}/{data_type_folder}/{data_column}" for instrument_folder, data_type_folder, data_column in comparison_selections]
+        response_data = streaming_analysis(
+            target_selection[0],
+            comparison_selections,
+            request.methods,
+            request.offset,
+            start_ts,
+            end_ts,
+            request.batch_rows,
+            request.rank_sample_size,
+            request.rank_engine
+        )
+
+        return render_response({"comparisons": comparisons, **response_data})
     except Exception as e:
-        print(f"Error in analyze: {e}")
-        import traceback
-        traceback.print_exc()
-        return {"error": str(e)}
\ No newline at end of file
+        log_event("analyze_streaming_failed", logging.ERROR, exc_info=True, error=str(e))
+        return {"error": str(e)}
+
+@app.post("/streaming-analysis")
+async def analyze_streaming(request: StreamingAnalysisRequest):
+    return await analysis_executor.run(_analyze_streaming, request)
+
+class CorrelationMatrixRequest(BaseModel):
+    instruments: list[str]
+    datatypes: list[str]
+    data_columns: list[str]
+    methods: list[str] = ["pearson"]
+    start_month: str
+    start_year: str
+    end_month: str
+    end_year: str
+    resample: str | None = None
+    aggregation: Literal["last", "first", "mean", "max", "min", "sum", "ohlc4"] = "last"
+    transform: Literal["levels", "returns", "log_returns"] = "levels"
+    min_periods: int = 3
+
+def _correlation_matrix(request: CorrelationMatrixRequest):
+    try:
+        if not any(method in MATRIX_METHODS for method in request.methods):
+            return {"error": f"Correlation matrix supports the methods: {', '.join(MATRIX_METHODS)}"}
+
+        start_ts, end_ts = _month_window(request)
+        selection = list(dict.fromkeys(find_series_selection(request.instruments, request.datatypes, request.data_columns)))
+        series_list = analysis_executor.map(lambda item: load_datatype_series(*item, start_ts, end_ts), selection)
+
+        labels, loaded = [], []
+        for (instrument_folder, data_type_folder, data_column), series in zip(selection, series_list):
+            if series is not None and len(series) > 0:
+                labels.append(f"{instrument_folder}/{data_type_folder}/{data_column}")
+                loaded.append(series)
+        # Series that do not share timestamps (ticks, mixed bar sizes) would
+        # grid on the union of all of them, so they go to a common bar first.
+        resample = request.resample
+        if resample is None and not shares_timestamps(loaded):
+            resample = "auto"
+        loaded = prepare_series_list(loaded, resample, request.aggregation, request.transform)
+
+        if len(loaded) < 2:
+            return {"error": "At least two series with data are needed for a correlation matrix"}
+
+        return render_response({"labels": labels, "resample": resample, **correlation_matrix(loaded, request.methods, request.min_periods)})
+    except Exception as e:
+        log_event("correlation_matrix_failed", logging.ERROR, exc_info=True, error=str(e))
+        return {"error": str(e)}
+
+@app.post("/correlation-matrix")
+async def get_correlation_matrix(request: CorrelationMatrixRequest):
+    return await analysis_executor.run(_correlation_matrix, request)
+
+class ZoomRequest(BaseModel):
+    instrument: str
+    datatype: str
+    data_column: str
+    start_ts: int
+    end_ts: int
+    max_points: int | None = 2000
+    downsample_method: Literal["lttb", "minmax"] = "lttb"
+    response_format: Literal["points", "columnar"] = "points"
+
+def _zoom(request: ZoomRequest, accept: str = None):
+    try:
+        content = get_target_data_by_instrument(
+            request.instrument,
+            request.datatype,
+            request.data_column,
+            request.start_ts,
+            request.end_ts
+        )
+
+        if content is None:
+            return {"error": "No data found for the selected instrument/column"}
+
+        response_data = {
+            "total_points": len(content),
+            "content": _display_series(content, request)
+        }
+
+        return render_response(response_data, request.response_format, accept)
+    except Exception as e:
+        log_event("zoom_failed", logging.ERROR, exc_info=True, error=str(e))
+        return {"error": str(e)}
+
+@app.post("/zoom")
+async def zoom(request: ZoomRequest, http_request: Request):
+    return await analysis_executor.run(_zoom, request, http_request.headers.get("accept"))
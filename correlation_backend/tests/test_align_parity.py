@@ -0,0 +1,132 @@
+import bisect
+import numpy as np
+import pandas as pd
+import pytest
+from correlation_backend.logic.read_data import align_series_with_offset
+
+OFFSETS = [-300, -5, -1, 0, 1, 2, 7, 300]
+
+
+def legacy_align_series_with_offset(target_series, comparison_series, offset=0):
+    # The per-timestamp bisect loop align_series_with_offset replaced, kept
+    # verbatim as the reference.
+    if target_series is None or comparison_series is None:
+        return None, None
+
+    if len(target_series) == 0 or len(comparison_series) == 0:
+        return target_series, comparison_series
+
+    if offset == 0:
+        common_index = target_series.index.intersection(comparison_series.index)
+        if len(common_index) == 0:
+            return target_series, comparison_series
+
+        target_aligned = target_series.loc[common_index].dropna()
+        comparison_aligned = comparison_series.loc[common_index].dropna()
+
+        final_index = target_aligned.index.intersection(comparison_aligned.index)
+        return target_aligned.loc[final_index], comparison_aligned.loc[final_index]
+
+    target_timestamps = sorted(target_series.index.tolist())
+    comparison_timestamps = sorted(comparison_series.index.tolist())
+
+    target_dict = target_series.to_dict()
+    comparison_dict = comparison_series.to_dict()
+
+    aligned_target_data = []
+    aligned_comparison_data = []
+    aligned_indices = []
+
+    for target_ts in target_timestamps:
+        target_val = target_dict.get(target_ts)
+        if target_val is None or pd.isna(target_val):
+            continue
+
+        if offset > 0:
+            pos = bisect.bisect_right(comparison_timestamps, target_ts)
+            if pos + offset - 1 < len(comparison_timestamps):
+                comp_ts = comparison_timestamps[pos + offset - 1]
+            else:
+                continue
+        else:
+            pos = bisect.bisect_left(comparison_timestamps, target_ts)
+            if pos + offset >= 0:
+                comp_ts = comparison_timestamps[pos + offset]
+            else:
+                continue
+
+        comp_val = comparison_dict.get(comp_ts)
+        if comp_val is None or pd.isna(comp_val):
+            continue
+
+        aligned_target_data.append(target_val)
+        aligned_comparison_data.append(comp_val)
+        aligned_indices.append(target_ts)
+
+    if not aligned_target_data:
+        return pd.Series(dtype=float), pd.Series(dtype=float)
+
+    target_aligned = pd.Series(data=aligned_target_data, index=aligned_indices, name='target')
+    comparison_aligned = pd.Series(data=aligned_comparison_data, index=aligned_indices, name='comparison')
+    return target_aligned, comparison_aligned
+
+
+def make_series(rng, n, name, duplicates=False, nans=False, unsorted=False):
+    timestamps = np.sort(rng.choice(np.arange(n * 3), n, replace=duplicates))
+    if unsorted:
+        rng.shuffle(timestamps)
+    values = rng.normal(size=n)
+    if nans:
+        values[rng.random(n) < 0.1] = np.nan
+    return pd.Series(values, index=timestamps, name=name)
+
+
+def assert_same_alignment(expected, actual):
+    for expected_series, actual_series in zip(expected, actual):
+        assert actual_series.name == expected_series.name
+        assert actual_series.index.equals(expected_series.index)
+        np.testing.assert_array_equal(actual_series.to_numpy(dtype=float), expected_series.to_numpy(dtype=float))
+
+
+@pytest.mark.parametrize("offset", OFFSETS)
+@pytest.mark.parametrize("duplicates", [False, True])
+@pytest.mark.parametrize("nans", [False, True])
+@pytest.mark.parametrize("unsorted", [False, True])
+def test_matches_legacy_alignment(offset, duplicates, nans, unsorted):
+    rng = np.random.default_rng(hash((offset, duplicates, nans, unsorted)) % 2 ** 32)
+    for _ in range(10):
+        target = make_series(rng, rng.integers(1, 200), 'target', duplicates, nans, unsorted)
+        comparison = make_series(rng, rng.integers(1, 200), 'comparison', duplicates, nans, unsorted)
+        assert_same_alignment(
+            legacy_align_series_with_offset(target, comparison, offset),
+            align_series_with_offset(target, comparison, offset),
+        )
+
+
+@pytest.mark.parametrize("offset", OFFSETS)
+def test_matches_legacy_alignment_on_random_cases(offset):
+    rng = np.random.default_rng(offset + 1000)
+    for _ in range(40):
+        target = make_series(rng, rng.integers(1, 200), 'target', rng.random() < 0.3, rng.random() < 0.3, rng.random() < 0.3)
+        comparison = make_series(rng, rng.integers(1, 200), 'comparison', rng.random() < 0.3, rng.random() < 0.3, rng.random() < 0.3)
+        assert_same_alignment(
+            legacy_align_series_with_offset(target, comparison, offset),
+            align_series_with_offset(target, comparison, offset),
+        )
+
+
+@pytest.mark.parametrize("offset", [-3, 3])
+def test_comparison_entirely_out_of_reach(offset):
+    target = pd.Series([1.0, 2.0], index=[100, 101], name='target')
+    comparison = pd.Series([3.0, 4.0], index=[0, 1] if offset < 0 else [200, 201], name='comparison')
+    assert_same_alignment(
+        legacy_align_series_with_offset(target, comparison, offset),
+        align_series_with_offset(target, comparison, offset),
+    )
+
+
+def test_empty_and_missing_inputs():
+    empty = pd.Series(dtype=float)
+    series = pd.Series([1.0], index=[0], name='target')
+    assert align_series_with_offset(None, series, 1) == (None, None)
+    assert align_series_with_offset(empty, series, 1) == (empty, series)
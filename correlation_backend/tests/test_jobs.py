@@ -0,0 +1,54 @@
+import time
+import numpy as np
+import pandas as pd
+from correlation_backend.logic.jobs import JobManager
+
+
+def wait_finished(manager, job):
+    deadline = time.time() + 10
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    # Eviction runs right after the status flips
+    with manager._lock:
+        pass
+
+
+def run_job(manager, result, fingerprint=None):
+    job = manager.submit(lambda job, value: value, result, fingerprint=fingerprint)
+    wait_finished(manager, job)
+    return job
+
+
+def test_least_recently_used_finished_jobs_are_evicted_past_the_count_limit():
+    manager = JobManager(max_running=1, max_finished=2)
+    first = run_job(manager, 1)
+    second = run_job(manager, 2)
+    assert manager.get(first.id) is first
+
+    third = run_job(manager, 3)
+
+    assert manager.get(second.id) is None
+    assert manager.get(first.id) is first
+    assert manager.get(third.id) is third
+
+
+def test_results_are_evicted_past_the_byte_budget():
+    series = pd.Series(np.arange(10_000, dtype=float))
+    manager = JobManager(max_running=1, max_result_bytes=int(series.memory_usage(index=True) * 2.5))
+    jobs = [run_job(manager, {"content": series.copy()}) for _ in range(4)]
+
+    assert [manager.get(job.id) is not None for job in jobs] == [False, False, True, True]
+
+
+def test_the_latest_result_is_kept_even_over_budget():
+    manager = JobManager(max_running=1, max_result_bytes=1)
+    job = run_job(manager, {"content": pd.Series(np.ones(1000))})
+    assert manager.get(job.id) is job
+    assert job.status == "completed"
+
+
+def test_expired_results_are_evicted():
+    manager = JobManager(max_running=1, result_ttl=0)
+    job = run_job(manager, 1)
+    time.sleep(0.01)
+    assert manager.get(job.id) is None
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from correlation_backend.logic.lag_scan import lag_scan
+from correlation_backend.logic.read_data import align_series_with_offset
+
+
+def make_series(rng, n, name, nans=False):
+    timestamps = np.sort(rng.choice(np.arange(n * 3), n, replace=False))
+    values = np.cumsum(rng.normal(size=n))
+    if nans:
+        values[rng.random(n) < 0.1] = np.nan
+    return pd.Series(values, index=timestamps, name=name)
+
+
+def aligned_pearson(target, comparison, lag):
+    if lag == 0 and len(target.index.intersection(comparison.index)) == 0:
+        # align_series_with_offset hands back both series unaligned here
+        return np.nan, 0
+    target_aligned, comparison_aligned = align_series_with_offset(target, comparison, lag)
+    x = target_aligned.to_numpy(dtype=float)
+    y = comparison_aligned.to_numpy(dtype=float)
+    if len(x) < 2 or np.ptp(x) == 0 or np.ptp(y) == 0:
+        return np.nan, len(x)
+    return np.corrcoef(x, y)[0, 1], len(x)
+
+
+@pytest.mark.parametrize("target_rows, comparison_rows", [(200, 20), (20, 200), (50, 50), (1, 30), (30, 2)])
+@pytest.mark.parametrize("nans", [False, True])
+def test_matches_alignment_for_lags_wider_than_the_series(target_rows, comparison_rows, nans):
+    rng = np.random.default_rng(target_rows * 1000 + comparison_rows + nans)
+    target = make_series(rng, target_rows, 'target', nans)
+    comparison = make_series(rng, comparison_rows, 'comparison', nans)
+    reach = 2 * max(target_rows, comparison_rows)
+    lags = list(range(-reach, reach + 1))
+
+    result = lag_scan(target, comparison, lags)
+
+    for lag, coefficient, n_obs in zip(lags, result["coefficients"], result["n_obs"]):
+        expected_coefficient, expected_n_obs = aligned_pearson(target, comparison, lag)
+        assert n_obs == expected_n_obs, lag
+        if np.isnan(expected_coefficient):
+            assert coefficient is None, lag
+        else:
+            assert coefficient == pytest.approx(expected_coefficient, abs=1e-6), lag
+
+
+def test_best_lag_ignores_unreachable_lags():
+    rng = np.random.default_rng(7)
+    target = make_series(rng, 200, 'target')
+    comparison = make_series(rng, 20, 'comparison')
+    lags = list(range(-40, 41))
+
+    result = lag_scan(target, comparison, lags)
+
+    for lag, n_obs in zip(lags, result["n_obs"]):
+        if n_obs == 0:
+            assert result["coefficients"][lags.index(lag)] is None
+    assert result["n_obs"][lags.index(result["best_lag"])] >= 2
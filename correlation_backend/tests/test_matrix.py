@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from correlation_backend.logic.matrix import correlation_matrix, shares_timestamps
+
+
+def gappy_series(seed, size=2_000):
+    rng = np.random.default_rng(seed)
+    index = np.sort(rng.choice(5 * size, size, replace=False))
+    values = np.cumsum(rng.normal(size=size))
+    values[rng.random(size) < 0.05] = np.nan
+    return pd.Series(values, index=index)
+
+
+def test_blocked_grid_matches_one_block():
+    series_list = [gappy_series(seed) for seed in range(4)]
+    whole = correlation_matrix(series_list, ["pearson", "spearman"], block_cells=10 ** 9)
+    blocked = correlation_matrix(series_list, ["pearson", "spearman"], block_cells=37)
+
+    assert blocked["n_obs"] == whole["n_obs"]
+    for method in ("pearson", "spearman"):
+        np.testing.assert_allclose(np.array(blocked[method]["coefficients"], dtype=float),
+                                   np.array(whole[method]["coefficients"], dtype=float), atol=1e-12)
+
+
+def test_pearson_matches_pandas_pairwise_complete():
+    series_list = [gappy_series(seed) for seed in range(4)]
+    result = correlation_matrix(series_list, ["pearson"], block_cells=100)
+    expected = pd.concat(series_list, axis=1).corr(min_periods=3).to_numpy()
+
+    np.testing.assert_allclose(np.array(result["pearson"]["coefficients"], dtype=float), expected, atol=1e-12)
+
+
+def test_shares_timestamps():
+    a = pd.Series([1.0, 2.0, 3.0], index=[1, 2, 3])
+    assert shares_timestamps([a, a * 2])
+    assert not shares_timestamps([a, pd.Series([1.0, 2.0], index=[1, 3])])
@@ -0,0 +1,98 @@
+import struct
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from correlation_backend.logic import read_data
+from correlation_backend.logic.series_cache import SeriesCache
+
+
+@pytest.fixture
+def parquet_file(tmp_path):
+    path = tmp_path / "part-000.parquet"
+    pd.DataFrame({"timestamp": np.arange(10_000, dtype=np.int64), "close": np.arange(10_000.0)}).to_parquet(path, index=False, row_group_size=1_000)
+    return str(path)
+
+
+def cached_columns(cache):
+    return [column for _, column in cache._entries]
+
+
+@pytest.mark.parametrize("max_bytes, start_ts, end_ts, whole_file", [
+    (10 ** 9, 2_000, 3_000, True),
+    (10_000 * 16 * 2, 2_000, 3_000, False),
+    (10_000 * 16 * 2, 1_000, 9_000, True),
+    (10_000 * 16 - 1, 1_000, 9_000, False),
+])
+def test_whole_file_is_cached_only_when_small_or_mostly_covered(parquet_file, monkeypatch, max_bytes, start_ts, end_ts, whole_file):
+    cache = SeriesCache(max_bytes)
+    monkeypatch.setattr(read_data, "series_cache", cache)
+    entry = {"min_timestamp": 0, "max_timestamp": 9_999, "num_rows": 10_000}
+
+    series = read_data.load_column_series(parquet_file, "close", start_ts, end_ts, entry["num_rows"], read_data._window_share(entry, start_ts, end_ts))
+
+    assert series.index.tolist() == list(range(start_ts, end_ts))
+    assert cached_columns(cache) == [("close", None, None) if whole_file else ("close", start_ts, end_ts)]
+
+
+def legacy_decode(value):
+    # The per-row decoder the Arrow path replaced
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, bytes) and len(value) == 8:
+        return float(struct.unpack('<q', value)[0])
+    if isinstance(value, str):
+        return float(value)
+    return np.nan
+
+
+def packed(values):
+    return [struct.pack('<q', value) for value in values]
+
+
+RAW = [1, -2, 2 ** 62, 0, -(2 ** 63), 123_456_789_012]
+BINARY_VALUES = {
+    "all_8_bytes": packed(RAW),
+    "nulls": [None, *packed(RAW[:3]), None, *packed(RAW[3:]), None],
+    "odd_lengths": [b"", b"\x01", b"\x01\x02\x03\x04\x05\x06\x07", *packed(RAW), b"\x00" * 9, b"\xff" * 16],
+}
+
+
+@pytest.mark.parametrize("values", BINARY_VALUES.values(), ids=BINARY_VALUES.keys())
+@pytest.mark.parametrize("binary_type", [pa.binary(), pa.large_binary()])
+def test_binary_array_matches_per_row_decode(values, binary_type):
+    expected = np.array([legacy_decode(value) for value in values])
+    array = pa.array(values, type=binary_type)
+
+    np.testing.assert_array_equal(read_data.decode_binary_array(array), expected)
+    for start, stop in [(1, len(values)), (2, len(values) - 1), (3, 3)]:
+        np.testing.assert_array_equal(read_data.decode_binary_array(array.slice(start, stop - start)), expected[start:stop])
+
+    chunked = pa.chunked_array([array.slice(0, 2), array.slice(2, 0), array.slice(2)])
+    np.testing.assert_array_equal(read_data.decode_binary_array(chunked), expected)
+
+
+def test_fixed_size_binary_slices_and_nulls():
+    values = [None, *packed(RAW), None]
+    expected = np.array([legacy_decode(value) for value in values])
+    array = pa.array(values, type=pa.binary(8))
+
+    np.testing.assert_array_equal(read_data.decode_binary_array(array), expected)
+    np.testing.assert_array_equal(read_data.decode_binary_array(array.slice(2, 4)), expected[2:6])
+    assert np.isnan(read_data.decode_binary_array(pa.array([b"\x01" * 4], type=pa.binary(4)))).all()
+
+
+@pytest.mark.parametrize("values", [
+    [*packed(RAW[:2]), "2.5", "12345678"],
+    [*packed(RAW[:2]), 3, 4.5, None],
+    ["1.5", *packed(RAW[:2]), None],
+    [None, *packed(RAW)],
+])
+def test_binary_column_matches_per_row_decode(values):
+    series = pd.Series(values, dtype=object, index=np.arange(len(values)) * 10)
+    decoded = read_data.decode_binary_column(series)
+
+    np.testing.assert_array_equal(decoded.to_numpy(dtype=float), np.array([legacy_decode(value) for value in values]))
+    assert decoded.index.equals(series.index)
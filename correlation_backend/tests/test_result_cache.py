@@ -0,0 +1,82 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from correlation_backend.logic import read_data
+from correlation_backend.logic.catalog import Catalog
+from correlation_backend.logic.result_cache import ResultCache
+
+
+def payload(rows=10_000):
+    return {"target_column_content": pd.Series(np.arange(rows, dtype=float))}
+
+
+def disk_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".pkl"))
+
+
+def test_disk_tier_drops_oldest_files_past_its_byte_budget(tmp_path):
+    ResultCache(directory=str(tmp_path / "probe")).put("probe", payload())
+    file_size = os.path.getsize(tmp_path / "probe" / "probe.pkl")
+    directory = tmp_path / "cache"
+    cache = ResultCache(directory=str(directory), disk_max_bytes=int(file_size * 2.5))
+
+    for key in "abcde":
+        cache.put(key, payload())
+
+    assert disk_files(directory) == ["d.pkl", "e.pkl"]
+    assert cache.stats()["disk_evictions"] == 3
+
+
+def test_disk_tier_does_not_keep_a_payload_over_the_budget(tmp_path):
+    cache = ResultCache(directory=str(tmp_path), disk_max_bytes=1000)
+    cache.put("a", payload())
+    assert disk_files(tmp_path) == []
+    assert cache.get("a")[1] == "HIT"
+
+
+def test_expired_files_are_swept_without_being_read(tmp_path):
+    cache = ResultCache(directory=str(tmp_path), ttl=60)
+    cache.put("old", payload(10))
+    expired = time.time() - 120
+    os.utime(tmp_path / "old.pkl", (expired, expired))
+
+    cache.put("new", payload(10))
+
+    assert disk_files(tmp_path) == ["new.pkl"]
+
+
+def test_sweep_runs_when_the_cache_starts(tmp_path):
+    ResultCache(directory=str(tmp_path)).put("old", payload(10))
+    expired = time.time() - 10_000
+    os.utime(tmp_path / "old.pkl", (expired, expired))
+
+    ResultCache(directory=str(tmp_path), ttl=60)
+
+    assert disk_files(tmp_path) == []
+
+
+def test_disk_hit_keeps_its_original_age(tmp_path):
+    ResultCache(directory=str(tmp_path), ttl=60).put("a", payload(10))
+    stored_at = time.time() - 50
+    os.utime(tmp_path / "a.pkl", (stored_at, stored_at))
+
+    cache = ResultCache(directory=str(tmp_path), ttl=60)
+    assert cache.get("a")[1] == "HIT-DISK"
+    assert cache._entries["a"][0] == pytest.approx(stored_at, abs=1)
+
+
+def test_data_version_sees_a_rewrite_before_the_catalog_refreshes(tmp_path, monkeypatch):
+    folder = tmp_path / "INST001" / "bars_1min"
+    folder.mkdir(parents=True)
+    path = folder / "part-000.parquet"
+    frame = pd.DataFrame({"timestamp": np.arange(10, dtype=np.int64), "close": np.arange(10.0)})
+    frame.to_parquet(path, index=False)
+    monkeypatch.setattr(read_data, "catalog", Catalog(str(tmp_path), index_path=str(tmp_path / "catalog.json"), refresh_interval=3600))
+
+    before = read_data.get_data_version(["INST001"], ["bars_1min"])
+    frame.assign(close=-frame["close"]).to_parquet(path, index=False)
+    os.utime(path, ns=(time.time_ns() + 10 ** 9, time.time_ns() + 10 ** 9))
+
+    assert read_data.get_data_version(["INST001"], ["bars_1min"]) != before
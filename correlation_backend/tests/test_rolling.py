@@ -0,0 +1,53 @@
+import warnings
+import numpy as np
+import pytest
+from scipy.stats import kendalltau, pearsonr, spearmanr
+from correlation_backend.logic.rolling import rolling_beta, rolling_kendalltau, rolling_pearson, rolling_spearman
+
+
+def random_walks(n, decimals=None, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.cumsum(rng.normal(size=n))
+    y = np.cumsum(rng.normal(size=n))
+    if decimals is not None:
+        x, y = np.round(x, decimals), np.round(y, decimals)
+    return x, y
+
+
+def per_window(statistic, x, y, window):
+    # Rounded walks have constant windows, where scipy warns and returns NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return np.array([statistic(x[t:t + window], y[t:t + window])[0] for t in range(len(x) - window + 1)])
+
+
+@pytest.mark.parametrize("n, window", [(600, 100), (300, 2), (300, 7), (400, 400), (500, 499)])
+@pytest.mark.parametrize("decimals", [None, 0])
+@pytest.mark.parametrize("block", [1, 5, 64])
+def test_rolling_spearman_ranks_each_window(n, window, decimals, block):
+    x, y = random_walks(n, decimals)
+    expected = per_window(spearmanr, x, y, window)
+    np.testing.assert_allclose(rolling_spearman(x, y, window, block), expected, atol=1e-12, equal_nan=True)
+
+
+def test_rolling_pearson_matches_pearsonr():
+    x, y = random_walks(500)
+    np.testing.assert_allclose(rolling_pearson(x, y, 50), per_window(pearsonr, x, y, 50), atol=1e-9)
+
+
+def test_rolling_pearson_and_beta_are_nan_on_flat_stretches():
+    x, y = random_walks(1000, seed=2)
+    x[400:600] = x[400]
+    flat = slice(400, 600 - 50 + 1)
+    assert np.isnan(rolling_pearson(x, y, 50)[flat]).all()
+    assert np.isnan(rolling_beta(x, y, 50)[flat]).all()
+    assert np.isfinite(rolling_pearson(x, y, 50)[:350]).all()
+
+
+def test_rolling_kendalltau_estimate_stays_close_on_gaussian_data():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=1000)
+    y = 0.6 * x + 0.8 * rng.normal(size=1000)
+    error = np.abs(rolling_kendalltau(x, y, 100) - per_window(kendalltau, x, y, 100))
+    assert error.mean() < 0.03
+    assert error.max() < 0.12
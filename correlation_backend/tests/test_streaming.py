@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from correlation_backend.logic.read_data import align_series_with_offset
+from correlation_backend.logic.streaming import ComparisonStream
+
+OFFSETS = [-7, -1, 0, 1, 7]
+
+
+def chunked(timestamps, values, batch_rows):
+    for start in range(0, len(timestamps), batch_rows):
+        yield timestamps[start:start + batch_rows], values[start:start + batch_rows]
+
+
+def series(seed, size, spacing):
+    rng = np.random.default_rng(seed)
+    timestamps = np.cumsum(rng.integers(1, spacing + 1, size)).astype(np.int64)
+    return timestamps, rng.normal(size=size)
+
+
+@pytest.mark.parametrize("offset", OFFSETS)
+def test_stream_pairs_like_align(offset):
+    target_timestamps, target_values = series(0, 3_000, 5)
+    comparison_timestamps, comparison_values = series(1, 5_000, 3)
+
+    stream = ComparisonStream(chunked(comparison_timestamps, comparison_values, 400), offset)
+    for timestamps, values in chunked(target_timestamps, target_values, 250):
+        stream.update(timestamps, values)
+
+    target_aligned, comparison_aligned = align_series_with_offset(
+        pd.Series(target_values, index=target_timestamps), pd.Series(comparison_values, index=comparison_timestamps), offset)
+    assert stream.moments.n == len(target_aligned)
+    assert stream.moments.mean_x == pytest.approx(target_aligned.mean())
+    assert stream.moments.mean_y == pytest.approx(comparison_aligned.mean())
+    assert stream.moments.sxy == pytest.approx(((target_aligned.to_numpy() - target_aligned.mean()) * (comparison_aligned.to_numpy() - comparison_aligned.mean())).sum())
+
+
+@pytest.mark.parametrize("offset", OFFSETS)
+def test_sparse_target_keeps_the_buffer_bounded(offset):
+    target_timestamps = np.arange(0, 2_000_000, 40_000, dtype=np.int64)
+    comparison_timestamps = np.arange(2_000_000, dtype=np.int64)
+    batch_rows = 1_000
+    buffered = []
+
+    def chunks():
+        for chunk in chunked(comparison_timestamps, np.ones(len(comparison_timestamps)), batch_rows):
+            buffered.append(len(stream._timestamps))
+            yield chunk
+
+    stream = ComparisonStream(chunks(), offset)
+    stream.update(target_timestamps, np.ones(len(target_timestamps)))
+
+    assert max(buffered) <= batch_rows + abs(offset)
+    # Only the target row at 0 has nothing before it to pair with.
+    assert stream.moments.n == len(target_timestamps) - (1 if offset < 0 else 0)
+
+
+@pytest.mark.parametrize("rank_engine", ["scipy", "subsample"])
+def test_rank_results_use_the_whole_reservoir(rank_engine):
+    timestamps, values = series(2, 120_000, 2)
+    stream = ComparisonStream(chunked(timestamps, values + 0.1, 10_000), 0, rank_sample_size=60_000)
+    for chunk_timestamps, chunk_values in chunked(timestamps, values, 10_000):
+        stream.update(chunk_timestamps, chunk_values)
+
+    results = stream.results(["pearson", "spearman", "kendalltau"], rank_engine)
+
+    assert results["rank_engine"]["engine"] == rank_engine
+    assert results["rank_engine"]["sample_size"] == 60_000
+    assert set(results["rank_engine"]["confidence_intervals"]) == {"spearman", "kendalltau"}
+    assert results["spearman"][0] == pytest.approx(1.0)